@@ -1,8 +1,7 @@
 import os
 import rawpy
-import imageio
-from PIL import Image, ExifTags
-from flask import Flask, request, jsonify, send_file
+from PIL import Image, ImageOps, ExifTags
+from flask import Flask, request, jsonify, send_file, g
 from werkzeug.utils import secure_filename
 import uuid
 from datetime import datetime
@@ -12,6 +11,20 @@ from functools import wraps
 import jwt
 import xml.etree.ElementTree as ET
 import hashlib
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from itertools import combinations
+import numpy as np
+import pyvips
+import sqlite3
+import json
+import base64
+import shutil
+import struct
+import subprocess
+import re
 
 # Load environment variables
 load_dotenv()
@@ -21,12 +34,23 @@ app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', './uploads')
 app.config['THUMBNAIL_HEIGHT'] = int(os.getenv('THUMBNAIL_HEIGHT', 320))
 app.config['MAX_FILE_SIZE'] = int(os.getenv('MAX_FILE_SIZE', 104857600))  # 100MB
 app.config['JWT_SECRET'] = os.getenv('JWT_SECRET')
+app.config['DUPLICATE_THRESHOLD'] = int(os.getenv('DUPLICATE_THRESHOLD', 10))
+app.config['TILE_SIZE'] = int(os.getenv('TILE_SIZE', 256))
+app.config['TILED_MIN_PIXELS'] = int(os.getenv('TILED_MIN_PIXELS', 50000000))  # 50MP
+app.config['ASSET_DB_PATH'] = os.getenv('ASSET_DB_PATH', os.path.join(app.config['UPLOAD_FOLDER'], 'assets.db'))
+app.config['PROCESSING_WORKERS'] = int(os.getenv('PROCESSING_WORKERS', os.cpu_count() or 4))
+app.config['RESERVED_INTERACTIVE_WORKERS'] = int(os.getenv('RESERVED_INTERACTIVE_WORKERS', 1))
+app.config['USER_CONCURRENCY'] = int(os.getenv('USER_CONCURRENCY', 2))
+app.config['CHUNKED_UPLOAD_TTL'] = int(os.getenv('CHUNKED_UPLOAD_TTL', 86400))  # 24h
+app.config['STRIP_GPS'] = os.getenv('STRIP_GPS', 'true').lower() == 'true'
 
 # Create upload directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'originals'), exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'thumbnails'), exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'presets'), exist_ok=True)
+os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'tiles'), exist_ok=True)
+os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'chunks'), exist_ok=True)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -40,8 +64,272 @@ PRESET_EXTENSIONS = set(['xmp', 'lrtemplate', 'dcp', 'dng'])  # Preset file exte
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def convert_raw_to_jpg(raw_path, output_path):
-    """Convert RAW image to JPG"""
+def save_upload(file, path):
+    """Save uploaded file, or move it into place if it is already on disk.
+
+    Returns the SHA-256 of the saved bytes, computed while streaming; None
+    for a file moved into place, whose hash the caller already has.
+    """
+    if isinstance(file, str):
+        os.replace(file, path)
+        return None
+    hasher = hashlib.sha256()
+    with open(path, 'wb') as f:
+        for chunk in iter(lambda: file.stream.read(1024 * 1024), b''):
+            f.write(chunk)
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+# Encode settings for originals: progressive with optimized Huffman tables.
+# Tiled-mode originals stay baseline: decoding a progressive JPEG needs all
+# of its DCT coefficients in memory, which defeats strip-wise streaming.
+JPEG_SAVE_OPTIONS = {'quality': 95, 'progressive': True, 'optimize': True}
+
+EXIF_ORIENTATION = 0x0112
+EXIF_GPS_IFD = 0x8825
+EXIF_HEADER = b'Exif\x00\x00'
+XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+# Extended XMP: header, 32-char GUID (MD5 of the full packet), total length, offset
+XMP_EXTENSION_HEADER = b'http://ns.adobe.com/xmp/extension/\x00'
+XMP_EXTENSION_CHUNK = 0xFFFF - 2 - len(XMP_EXTENSION_HEADER) - 40
+XMP_EXIF_NAMESPACE = b'http://ns.adobe.com/exif/1.0/'
+
+# Lossless jpegtran operation that makes each EXIF orientation upright
+JPEGTRAN = shutil.which('jpegtran')
+ORIENTATION_TRANSFORMS = {
+    2: ['-flip', 'horizontal'],
+    3: ['-rotate', '180'],
+    4: ['-flip', 'vertical'],
+    5: ['-transpose'],
+    6: ['-rotate', '90'],
+    7: ['-transverse'],
+    8: ['-rotate', '270'],
+}
+
+def is_jpeg_file(path):
+    """Check the start-of-image marker; the extension alone is not trusted"""
+    with open(path, 'rb') as f:
+        return f.read(2) == b'\xff\xd8'
+
+def read_jpeg_header(f):
+    """Read JPEG marker segments up to and including SOS as [(marker, payload)]"""
+    if f.read(2) != b'\xff\xd8':
+        raise ValueError('Not a JPEG file')
+    segments = []
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ValueError('Corrupt JPEG header')
+        while marker[1] == 0xFF:  # Fill bytes
+            marker = marker[1:] + f.read(1)
+        try:
+            length = struct.unpack('>H', f.read(2))[0]
+        except struct.error:
+            raise ValueError('Truncated JPEG header')
+        payload = f.read(length - 2)
+        if length < 2 or len(payload) < length - 2:
+            raise ValueError('Truncated JPEG header')
+        segments.append((marker[1], payload))
+        if marker[1] == 0xDA:  # Start of scan, entropy-coded data follows
+            return segments
+
+def load_exif(segments):
+    for marker, payload in segments:
+        if marker == 0xE1 and payload.startswith(EXIF_HEADER):
+            exif = Image.Exif()
+            exif.load(payload)
+            return exif
+    return None
+
+def clean_exif(exif, reset_orientation):
+    """Return EXIF bytes with orientation reset and GPS stripped as configured"""
+    if reset_orientation and EXIF_ORIENTATION in exif:
+        exif[EXIF_ORIENTATION] = 1
+    if app.config['STRIP_GPS'] and EXIF_GPS_IFD in exif:
+        del exif[EXIF_GPS_IFD]
+    return exif.tobytes()
+
+def strip_xmp_gps(xmp):
+    """Remove exif:GPS* properties (attributes or elements) from XMP bytes"""
+    # The conventional prefix too, in case a packet omits the declaration
+    prefixes = {b'exif'} | set(re.findall(
+        rb'xmlns:([\w.-]+)\s*=\s*["\']' + re.escape(XMP_EXIF_NAMESPACE) + rb'["\']', xmp
+    ))
+    for prefix in prefixes:
+        name = re.escape(prefix) + rb':GPS[\w.-]*'
+        xmp = re.sub(rb'\s+' + name + rb'\s*=\s*(?:"[^"]*"|\'[^\']*\')', b'', xmp)
+        xmp = re.sub(rb'<' + name + rb'\b[^>]*/>', b'', xmp)
+        xmp = re.sub(rb'<(' + name + rb')\b[^>]*>.*?</\1\s*>', b'', xmp, flags=re.DOTALL)
+    return xmp
+
+def strip_xmp_gps_segments(segments):
+    """Return segments with GPS removed from XMP and Extended XMP, or None if unchanged.
+
+    Extended XMP is reassembled per GUID, stripped and re-chunked under a new
+    GUID; the main packet's xmpNote:HasExtendedXMP is updated to match.
+    """
+    extended = defaultdict(dict)  # GUID -> {offset: chunk}
+    for marker, payload in segments:
+        if marker == 0xE1 and payload.startswith(XMP_EXTENSION_HEADER):
+            body = payload[len(XMP_EXTENSION_HEADER):]
+            if len(body) >= 40:
+                extended[body[:32]][struct.unpack('>I', body[36:40])[0]] = body[40:]
+
+    replaced = {}  # old GUID -> (new GUID, new extension segment payloads)
+    for guid, chunks in extended.items():
+        data = b''.join(chunks[offset] for offset in sorted(chunks))
+        stripped = strip_xmp_gps(data)
+        if stripped == data:
+            continue
+        new_guid = hashlib.md5(stripped).hexdigest().upper().encode()
+        replaced[guid] = (new_guid, [
+            XMP_EXTENSION_HEADER + new_guid + struct.pack('>II', len(stripped), offset) +
+            stripped[offset:offset + XMP_EXTENSION_CHUNK]
+            for offset in range(0, len(stripped), XMP_EXTENSION_CHUNK)
+        ])
+
+    changed = bool(replaced)
+    new_segments = []
+    for marker, payload in segments:
+        if marker == 0xE1 and payload.startswith(XMP_HEADER):
+            xmp = strip_xmp_gps(payload[len(XMP_HEADER):])
+            for guid, (new_guid, _) in replaced.items():
+                xmp = xmp.replace(guid, new_guid)
+            if XMP_HEADER + xmp != payload:
+                changed = True
+                payload = XMP_HEADER + xmp
+        elif marker == 0xE1 and payload.startswith(XMP_EXTENSION_HEADER):
+            guid = payload[len(XMP_EXTENSION_HEADER):][:32]
+            if guid in replaced:
+                # All new chunks go where the first old chunk was
+                new_segments.extend((marker, chunk) for chunk in replaced[guid][1])
+                replaced[guid] = (replaced[guid][0], [])
+                continue
+        new_segments.append((marker, payload))
+    return new_segments if changed else None
+
+def rewrite_jpeg_metadata(image_path, reset_orientation=False):
+    """Rewrite EXIF/XMP segments in place without touching the image data.
+
+    Keeps ICC and all other metadata; resets Orientation after the pixels
+    were transformed and drops GPS (EXIF and XMP) when STRIP_GPS is set.
+    Returns True if the file was changed.
+    """
+    with open(image_path, 'rb') as f:
+        segments = read_jpeg_header(f)
+        scan_offset = f.tell()
+
+    exif = load_exif(segments)
+    strip_gps = app.config['STRIP_GPS']
+    exif_changed = exif is not None and (
+        (reset_orientation and exif.get(EXIF_ORIENTATION, 1) != 1) or
+        (strip_gps and EXIF_GPS_IFD in exif)
+    )
+    xmp_segments = strip_xmp_gps_segments(segments) if strip_gps else None
+    if not exif_changed and xmp_segments is None:
+        return False
+
+    new_segments = []
+    for marker, payload in xmp_segments or segments:
+        if marker == 0xE1 and payload.startswith(EXIF_HEADER) and exif_changed:
+            payload = clean_exif(exif, reset_orientation)
+            if len(payload) > 0xFFFF - 2:
+                logger.warning(f'EXIF too large to rewrite, dropping it: {image_path}')
+                continue
+        new_segments.append((marker, payload))
+
+    temp_path = f'{image_path}.tmp'
+    with open(image_path, 'rb') as src, open(temp_path, 'wb') as dst:
+        dst.write(b'\xff\xd8')
+        for marker, payload in new_segments:
+            dst.write(bytes([0xFF, marker]) + struct.pack('>H', len(payload) + 2) + payload)
+        src.seek(scan_offset)
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(temp_path, image_path)
+    return True
+
+def run_jpegtran(image_path, args, progressive=True):
+    """Losslessly transform JPEG in place with jpegtran; False if not possible"""
+    if not JPEGTRAN:
+        return False
+    temp_path = f'{image_path}.tmp'
+    scan_args = ['-progressive'] if progressive else []
+    try:
+        subprocess.run(
+            [JPEGTRAN, '-copy', 'all', '-optimize', *scan_args, *args, '-outfile', temp_path, image_path],
+            check=True, capture_output=True, timeout=300
+        )
+        os.replace(temp_path, image_path)
+        return True
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f'jpegtran failed for {image_path}: {str(e)}')
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+def encode_jpeg(img, output_path, exif=None):
+    """Save PIL image as upright, progressive, optimized JPEG keeping ICC/EXIF"""
+    icc_profile = img.info.get('icc_profile')
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = background
+    elif img.mode not in ('RGB', 'L', 'CMYK'):
+        img = img.convert('RGB')
+
+    options = dict(JPEG_SAVE_OPTIONS)
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    if exif is not None:
+        options['exif'] = clean_exif(exif, reset_orientation=True)
+    img.save(output_path, 'JPEG', **options)
+
+def normalize_jpeg(image_path, streaming=False):
+    """Make a JPEG original upright, metadata-clean and progressive.
+
+    Pixels are only re-encoded when the orientation has to be applied and
+    jpegtran cannot do it losslessly. Already compliant files are left
+    untouched. In streaming (tiled) mode the result is baseline instead of
+    progressive so it can later be decoded in strips.
+    Returns 'unchanged', 'lossless' or 'reencoded'.
+    """
+    with open(image_path, 'rb') as f:
+        segments = read_jpeg_header(f)
+    exif = load_exif(segments)
+    orientation = exif.get(EXIF_ORIENTATION, 1) if exif is not None else 1
+    progressive = any(marker == 0xC2 for marker, _ in segments)
+    want_progressive = not streaming
+
+    if orientation not in ORIENTATION_TRANSFORMS:
+        # Huffman optimization and switching scan mode are lossless too
+        optimized = (progressive != want_progressive and
+                     run_jpegtran(image_path, [], progressive=want_progressive))
+        rewritten = rewrite_jpeg_metadata(image_path)
+        return 'lossless' if optimized or rewritten else 'unchanged'
+
+    # -perfect fails rather than trimming edges that are not whole MCUs
+    transform = ['-perfect', *ORIENTATION_TRANSFORMS[orientation]]
+    if run_jpegtran(image_path, transform, progressive=want_progressive):
+        rewrite_jpeg_metadata(image_path, reset_orientation=True)
+        return 'lossless'
+
+    temp_path = f'{image_path}.tmp'
+    if streaming:
+        # Rotation needs random access, but libvips still avoids Pillow's limits
+        image = pyvips.Image.new_from_file(image_path).autorot()
+        image.jpegsave(temp_path, Q=JPEG_SAVE_OPTIONS['quality'], optimize_coding=True)
+    else:
+        with Image.open(image_path) as img:
+            encode_jpeg(img, temp_path, exif)
+    os.replace(temp_path, image_path)
+    rewrite_jpeg_metadata(image_path, reset_orientation=True)
+    return 'reencoded'
+
+def convert_raw_to_jpg(raw_path, output_path, baseline=False):
+    """Convert RAW image to JPG (baseline for tiled mode)"""
     try:
         with rawpy.imread(raw_path) as raw:
             rgb = raw.postprocess(
@@ -50,7 +338,11 @@ def convert_raw_to_jpg(raw_path, output_path):
                 no_auto_bright=False,
                 output_bps=8
             )
-        imageio.imsave(output_path, rgb)
+        options = dict(JPEG_SAVE_OPTIONS)
+        if baseline or rgb.shape[0] * rgb.shape[1] >= app.config['TILED_MIN_PIXELS']:
+            options['progressive'] = False
+        # LibRaw already applies the sensor orientation to the pixels
+        Image.fromarray(rgb).save(output_path, 'JPEG', **options)
         logger.info(f'Converted RAW to JPG: {output_path}')
         return True
     except Exception as e:
@@ -61,6 +353,9 @@ def create_thumbnail(image_path, thumbnail_path, height=320):
     """Create thumbnail with specified height, auto width"""
     try:
         with Image.open(image_path) as img:
+            # Apply EXIF orientation so rotated photos are not sideways
+            img = ImageOps.exif_transpose(img)
+
             # Convert RGBA to RGB if needed
             if img.mode in ('RGBA', 'LA', 'P'):
                 background = Image.new('RGB', img.size, (255, 255, 255))
@@ -84,315 +379,1185 @@ def create_thumbnail(image_path, thumbnail_path, height=320):
         logger.error(f'Error creating thumbnail: {str(e)}')
         raise
 
+# Tiled mode: libvips streams the image top to bottom in strips
+# (access='sequential'), so memory stays bounded regardless of image size
+# and Pillow's decompression-bomb limit is never hit.
+
+def is_large_image(image_path):
+    """Check if image is large enough to be processed in tiled mode"""
+    try:
+        image = pyvips.Image.new_from_file(image_path)
+        return image.width * image.height >= app.config['TILED_MIN_PIXELS']
+    except pyvips.Error as e:
+        logger.warning(f'Could not read image header: {str(e)}')
+        return False
+
+def convert_to_jpg_streaming(image_path, output_path):
+    """Convert image to baseline JPG in strips, flattening alpha onto white"""
+    try:
+        image = pyvips.Image.new_from_file(image_path, access='sequential')
+        if image.hasalpha():
+            image = image.flatten(background=[255, 255, 255])
+        image.jpegsave(output_path, Q=JPEG_SAVE_OPTIONS['quality'], optimize_coding=True)
+        logger.info(f'Converted to JPG (streaming): {output_path}')
+        return True
+    except Exception as e:
+        logger.error(f'Error converting to JPG: {str(e)}')
+        raise
+
+def create_thumbnail_streaming(image_path, thumbnail_path, height=320):
+    """Create thumbnail with specified height using shrink-on-load"""
+    try:
+        # Width is unconstrained so only the height limits the size
+        thumb = pyvips.Image.thumbnail(image_path, 10000000, height=height, size='down')
+        thumb.jpegsave(thumbnail_path, Q=85, optimize_coding=True)
+        logger.info(f'Created thumbnail (streaming): {thumbnail_path}')
+        return True
+    except Exception as e:
+        logger.error(f'Error creating thumbnail: {str(e)}')
+        raise
+
+def generate_tile_pyramid(image_path, image_id):
+    """Generate DeepZoom tile pyramid (<image_id>.dzi + <image_id>_files/)"""
+    try:
+        tiles_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'tiles')
+        image = pyvips.Image.new_from_file(image_path, access='sequential')
+        image.dzsave(
+            os.path.join(tiles_dir, image_id),
+            layout='dz',
+            tile_size=app.config['TILE_SIZE'],
+            overlap=0,
+            depth='onepixel',
+            suffix='.jpg[Q=85]'
+        )
+        logger.info(f'Generated tile pyramid: {image_id} ({image.width}x{image.height})')
+        return True
+    except Exception as e:
+        logger.error(f'Error generating tile pyramid: {str(e)}')
+        raise
+
+# libvips band count to the equivalent Pillow mode
+VIPS_MODES = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+
+def flatten_exif(exif):
+    """Merge IFD0, the EXIF sub-IFD and GPS into one dict like Pillow's _getexif()"""
+    tags = dict(exif)
+    tags.pop(EXIF_GPS_IFD, None)
+    tags.update(exif.get_ifd(0x8769))
+    gps = exif.get_ifd(EXIF_GPS_IFD)
+    if gps:
+        tags[EXIF_GPS_IFD] = gps
+    return tags
+
+def read_image_header(image_path):
+    """Return (width, height, format, mode, EXIF tags) without decoding pixels.
+
+    Pillow refuses to even open images past its decompression-bomb limit,
+    which is what tiled mode is for, so their header is read with libvips.
+    """
+    try:
+        with Image.open(image_path) as img:
+            return img.width, img.height, img.format, img.mode, img._getexif()
+    except Image.DecompressionBombError:
+        pass
+    image = pyvips.Image.new_from_file(image_path)
+    exif = None
+    if 'exif-data' in image.get_fields():
+        exif = Image.Exif()
+        exif.load(image.get('exif-data'))
+        exif = flatten_exif(exif)
+    image_format = image.get('vips-loader').split('load')[0].upper()
+    mode = 'CMYK' if image.interpretation == 'cmyk' else VIPS_MODES.get(image.bands, 'RGB')
+    return image.width, image.height, image_format, mode, exif
+
 def extract_exif_data(image_path):
     """Extract comprehensive EXIF metadata from image"""
     try:
-        with Image.open(image_path) as img:
-            metadata = {}
-            
-            # Get basic image info
-            metadata['width'] = img.width
-            metadata['height'] = img.height
-            metadata['dimensions'] = f"{img.width}x{img.height}"
-            metadata['format'] = img.format
-            metadata['colorSpace'] = img.mode
-            
-            # Get file size
-            if os.path.exists(image_path):
-                metadata['fileSize'] = os.path.getsize(image_path)
-            
-            # Get EXIF data
-            exif = img._getexif()
-            if exif is None:
-                return metadata
-            
-            # Create reverse lookup for EXIF tags
-            exif_tags = {v: k for k, v in ExifTags.TAGS.items()}
-            
-            # Helper function to get EXIF value
-            def get_exif_value(tag_name):
-                tag_id = exif_tags.get(tag_name)
-                if tag_id and tag_id in exif:
-                    return exif[tag_id]
-                return None
-            
-            # Helper function to format rational number
-            def format_rational(value):
-                if hasattr(value, 'numerator') and hasattr(value, 'denominator'):
-                    if value.denominator == 0:
-                        return None
-                    return value.numerator / value.denominator
-                return value
-            
-            # Basic Image Info
-            orientation = get_exif_value('Orientation')
-            if orientation:
-                metadata['orientation'] = int(orientation)
-            
-            resolution_unit = get_exif_value('ResolutionUnit')
-            x_resolution = get_exif_value('XResolution')
-            if x_resolution:
-                dpi = format_rational(x_resolution)
-                if dpi:
-                    metadata['dpi'] = int(dpi)
-            
-            bits_per_sample = get_exif_value('BitsPerSample')
-            if bits_per_sample:
-                if isinstance(bits_per_sample, tuple):
-                    metadata['bitDepth'] = sum(bits_per_sample)
+        width, height, image_format, mode, exif = read_image_header(image_path)
+        metadata = {}
+        
+        # Get basic image info
+        metadata['width'] = width
+        metadata['height'] = height
+        metadata['dimensions'] = f"{width}x{height}"
+        metadata['format'] = image_format
+        metadata['colorSpace'] = mode
+        
+        # Get file size
+        if os.path.exists(image_path):
+            metadata['fileSize'] = os.path.getsize(image_path)
+        
+        if exif is None:
+            return metadata
+        
+        # Create reverse lookup for EXIF tags
+        exif_tags = {v: k for k, v in ExifTags.TAGS.items()}
+        
+        # Helper function to get EXIF value
+        def get_exif_value(tag_name):
+            tag_id = exif_tags.get(tag_name)
+            if tag_id and tag_id in exif:
+                return exif[tag_id]
+            return None
+        
+        # Helper function to format rational number
+        def format_rational(value):
+            if hasattr(value, 'numerator') and hasattr(value, 'denominator'):
+                if value.denominator == 0:
+                    return None
+                return value.numerator / value.denominator
+            return value
+        
+        # Basic Image Info
+        orientation = get_exif_value('Orientation')
+        if orientation:
+            metadata['orientation'] = int(orientation)
+        
+        resolution_unit = get_exif_value('ResolutionUnit')
+        x_resolution = get_exif_value('XResolution')
+        if x_resolution:
+            dpi = format_rational(x_resolution)
+            if dpi:
+                metadata['dpi'] = int(dpi)
+        
+        bits_per_sample = get_exif_value('BitsPerSample')
+        if bits_per_sample:
+            if isinstance(bits_per_sample, tuple):
+                metadata['bitDepth'] = sum(bits_per_sample)
+            else:
+                metadata['bitDepth'] = int(bits_per_sample)
+        
+        # Camera Information
+        camera_make = get_exif_value('Make')
+        if camera_make:
+            metadata['cameraMake'] = str(camera_make).strip()
+        
+        camera_model = get_exif_value('Model')
+        if camera_model:
+            metadata['cameraModel'] = str(camera_model).strip()
+        
+        camera_serial = get_exif_value('BodySerialNumber')
+        if camera_serial:
+            metadata['cameraSerialNumber'] = str(camera_serial).strip()
+        
+        # Lens Information
+        lens_make = get_exif_value('LensMake')
+        if lens_make:
+            metadata['lensMake'] = str(lens_make).strip()
+        
+        lens_model = get_exif_value('LensModel')
+        if lens_model:
+            metadata['lensModel'] = str(lens_model).strip()
+        
+        lens_serial = get_exif_value('LensSerialNumber')
+        if lens_serial:
+            metadata['lensSerialNumber'] = str(lens_serial).strip()
+        
+        focal_length = get_exif_value('FocalLength')
+        if focal_length:
+            fl = format_rational(focal_length)
+            if fl:
+                metadata['focalLength'] = f"{fl:.0f}mm"
+        
+        focal_length_35mm = get_exif_value('FocalLengthIn35mmFilm')
+        if focal_length_35mm:
+            metadata['focalLengthIn35mm'] = f"{int(focal_length_35mm)}mm"
+        
+        # Exposure Settings
+        iso = get_exif_value('ISOSpeedRatings')
+        if iso:
+            metadata['iso'] = int(iso) if isinstance(iso, int) else iso
+        
+        f_number = get_exif_value('FNumber')
+        if f_number:
+            f_val = format_rational(f_number)
+            if f_val:
+                metadata['fStop'] = f"f/{f_val:.1f}"
+                metadata['aperture'] = f"f/{f_val:.1f}"
+        
+        exposure_time = get_exif_value('ExposureTime')
+        if exposure_time:
+            exp = format_rational(exposure_time)
+            if exp:
+                if exp < 1:
+                    metadata['shutterSpeed'] = f"1/{int(1/exp)}s"
+                    metadata['exposureTime'] = f"1/{int(1/exp)}s"
                 else:
-                    metadata['bitDepth'] = int(bits_per_sample)
-            
-            # Camera Information
-            camera_make = get_exif_value('Make')
-            if camera_make:
-                metadata['cameraMake'] = str(camera_make).strip()
-            
-            camera_model = get_exif_value('Model')
-            if camera_model:
-                metadata['cameraModel'] = str(camera_model).strip()
-            
-            camera_serial = get_exif_value('BodySerialNumber')
-            if camera_serial:
-                metadata['cameraSerialNumber'] = str(camera_serial).strip()
-            
-            # Lens Information
-            lens_make = get_exif_value('LensMake')
-            if lens_make:
-                metadata['lensMake'] = str(lens_make).strip()
-            
-            lens_model = get_exif_value('LensModel')
-            if lens_model:
-                metadata['lensModel'] = str(lens_model).strip()
-            
-            lens_serial = get_exif_value('LensSerialNumber')
-            if lens_serial:
-                metadata['lensSerialNumber'] = str(lens_serial).strip()
-            
-            focal_length = get_exif_value('FocalLength')
-            if focal_length:
-                fl = format_rational(focal_length)
-                if fl:
-                    metadata['focalLength'] = f"{fl:.0f}mm"
-            
-            focal_length_35mm = get_exif_value('FocalLengthIn35mmFilm')
-            if focal_length_35mm:
-                metadata['focalLengthIn35mm'] = f"{int(focal_length_35mm)}mm"
-            
-            # Exposure Settings
-            iso = get_exif_value('ISOSpeedRatings')
-            if iso:
-                metadata['iso'] = int(iso) if isinstance(iso, int) else iso
-            
-            f_number = get_exif_value('FNumber')
-            if f_number:
-                f_val = format_rational(f_number)
-                if f_val:
-                    metadata['fStop'] = f"f/{f_val:.1f}"
-                    metadata['aperture'] = f"f/{f_val:.1f}"
-            
-            exposure_time = get_exif_value('ExposureTime')
-            if exposure_time:
-                exp = format_rational(exposure_time)
-                if exp:
-                    if exp < 1:
-                        metadata['shutterSpeed'] = f"1/{int(1/exp)}s"
-                        metadata['exposureTime'] = f"1/{int(1/exp)}s"
-                    else:
-                        metadata['shutterSpeed'] = f"{exp:.2f}s"
-                        metadata['exposureTime'] = f"{exp:.2f}s"
-            
-            exposure_mode = get_exif_value('ExposureMode')
-            if exposure_mode is not None:
-                modes = {0: 'Auto', 1: 'Manual', 2: 'Auto bracket'}
-                metadata['exposureMode'] = modes.get(exposure_mode, f'Unknown ({exposure_mode})')
-            
-            exposure_program = get_exif_value('ExposureProgram')
-            if exposure_program is not None:
-                programs = {
-                    0: 'Not defined', 1: 'Manual', 2: 'Program AE',
-                    3: 'Aperture-priority AE', 4: 'Shutter speed priority AE',
-                    5: 'Creative (Slow speed)', 6: 'Action (High speed)',
-                    7: 'Portrait', 8: 'Landscape'
-                }
-                metadata['exposureProgram'] = programs.get(exposure_program, f'Unknown ({exposure_program})')
-            
-            exposure_bias = get_exif_value('ExposureBiasValue')
-            if exposure_bias:
-                bias = format_rational(exposure_bias)
-                if bias is not None:
-                    metadata['exposureBias'] = f"{bias:+.1f} EV"
-            
-            metering_mode = get_exif_value('MeteringMode')
-            if metering_mode is not None:
-                modes = {
-                    0: 'Unknown', 1: 'Average', 2: 'Center-weighted average',
-                    3: 'Spot', 4: 'Multi-spot', 5: 'Multi-segment', 6: 'Partial'
-                }
-                metadata['meteringMode'] = modes.get(metering_mode, f'Unknown ({metering_mode})')
-            
-            # Flash & Lighting
-            flash = get_exif_value('Flash')
-            if flash is not None:
-                flash_fired = flash & 0x01
-                flash_modes = {
-                    0x00: 'No flash', 0x01: 'Fired',
-                    0x05: 'Fired, Return not detected',
-                    0x07: 'Fired, Return detected',
-                    0x09: 'Yes, compulsory', 0x0D: 'Yes, compulsory, return not detected',
-                    0x0F: 'Yes, compulsory, return detected',
-                    0x10: 'No, compulsory', 0x18: 'No, auto',
-                    0x19: 'Yes, auto', 0x1D: 'Yes, auto, return not detected',
-                    0x1F: 'Yes, auto, return detected'
-                }
-                metadata['flash'] = flash_modes.get(flash, f'Flash ({flash})')
-            
-            white_balance = get_exif_value('WhiteBalance')
-            if white_balance is not None:
-                wb_modes = {0: 'Auto', 1: 'Manual'}
-                metadata['whiteBalance'] = wb_modes.get(white_balance, f'Unknown ({white_balance})')
-            
-            light_source = get_exif_value('LightSource')
-            if light_source is not None:
-                sources = {
-                    0: 'Unknown', 1: 'Daylight', 2: 'Fluorescent',
-                    3: 'Tungsten', 4: 'Flash', 9: 'Fine weather',
-                    10: 'Cloudy', 11: 'Shade', 12: 'Daylight fluorescent',
-                    13: 'Day white fluorescent', 14: 'Cool white fluorescent',
-                    15: 'White fluorescent', 17: 'Standard light A',
-                    18: 'Standard light B', 19: 'Standard light C',
-                    20: 'D55', 21: 'D65', 22: 'D75', 23: 'D50',
-                    24: 'ISO studio tungsten', 255: 'Other'
-                }
-                metadata['lightSource'] = sources.get(light_source, f'Unknown ({light_source})')
-            
-            # Focus Settings
-            focus_mode = get_exif_value('FocusMode')
-            if focus_mode:
-                metadata['focusMode'] = str(focus_mode)
-            
-            subject_distance = get_exif_value('SubjectDistance')
-            if subject_distance:
-                dist = format_rational(subject_distance)
-                if dist:
-                    metadata['subjectDistance'] = f"{dist:.2f}m"
-            
-            subject_distance_range = get_exif_value('SubjectDistanceRange')
-            if subject_distance_range is not None:
-                ranges = {0: 'Unknown', 1: 'Macro', 2: 'Close', 3: 'Distant'}
-                metadata['subjectDistanceRange'] = ranges.get(subject_distance_range, f'Unknown ({subject_distance_range})')
-            
-            # Date & Time
-            date_time_original = get_exif_value('DateTimeOriginal')
-            if date_time_original:
-                metadata['dateTimeOriginal'] = str(date_time_original)
-            
-            date_time_digitized = get_exif_value('DateTimeDigitized')
-            if date_time_digitized:
-                metadata['dateTimeDigitized'] = str(date_time_digitized)
-            
-            date_time = get_exif_value('DateTime')
-            if date_time:
-                metadata['dateTime'] = str(date_time)
-            
-            # Author & Copyright
-            artist = get_exif_value('Artist')
-            if artist:
-                metadata['artist'] = str(artist).strip()
-                metadata['author'] = str(artist).strip()
-            
-            copyright_info = get_exif_value('Copyright')
-            if copyright_info:
-                metadata['copyright'] = str(copyright_info).strip()
-            
-            # Software
-            software = get_exif_value('Software')
-            if software:
-                metadata['software'] = str(software).strip()
-            
-            # Image Quality Settings
-            contrast = get_exif_value('Contrast')
-            if contrast is not None:
-                contrasts = {0: 'Normal', 1: 'Low', 2: 'High'}
-                metadata['contrast'] = contrasts.get(contrast, f'Unknown ({contrast})')
-            
-            saturation = get_exif_value('Saturation')
-            if saturation is not None:
-                saturations = {0: 'Normal', 1: 'Low', 2: 'High'}
-                metadata['saturation'] = saturations.get(saturation, f'Unknown ({saturation})')
-            
-            sharpness = get_exif_value('Sharpness')
-            if sharpness is not None:
-                sharpnesses = {0: 'Normal', 1: 'Soft', 2: 'Hard'}
-                metadata['sharpness'] = sharpnesses.get(sharpness, f'Unknown ({sharpness})')
-            
-            brightness = get_exif_value('BrightnessValue')
-            if brightness:
-                bright = format_rational(brightness)
-                if bright is not None:
-                    metadata['brightness'] = f"{bright:.2f}"
-            
-            gain_control = get_exif_value('GainControl')
-            if gain_control is not None:
-                gains = {0: 'None', 1: 'Low gain up', 2: 'High gain up', 3: 'Low gain down', 4: 'High gain down'}
-                metadata['gainControl'] = gains.get(gain_control, f'Unknown ({gain_control})')
-            
-            digital_zoom = get_exif_value('DigitalZoomRatio')
-            if digital_zoom:
-                zoom = format_rational(digital_zoom)
-                if zoom:
-                    metadata['digitalZoomRatio'] = f"{zoom:.2f}x"
-            
-            # Scene Information
-            scene_type = get_exif_value('SceneType')
-            if scene_type:
-                metadata['sceneType'] = str(scene_type)
-            
-            scene_capture_type = get_exif_value('SceneCaptureType')
-            if scene_capture_type is not None:
-                scenes = {0: 'Standard', 1: 'Landscape', 2: 'Portrait', 3: 'Night'}
-                metadata['sceneCaptureType'] = scenes.get(scene_capture_type, f'Unknown ({scene_capture_type})')
-            
-            # GPS Information
-            gps_info = get_exif_value('GPSInfo')
-            if gps_info:
-                try:
-                    # Extract GPS coordinates
-                    def convert_to_degrees(value):
-                        d = float(value[0])
-                        m = float(value[1])
-                        s = float(value[2])
-                        return d + (m / 60.0) + (s / 3600.0)
+                    metadata['shutterSpeed'] = f"{exp:.2f}s"
+                    metadata['exposureTime'] = f"{exp:.2f}s"
+        
+        exposure_mode = get_exif_value('ExposureMode')
+        if exposure_mode is not None:
+            modes = {0: 'Auto', 1: 'Manual', 2: 'Auto bracket'}
+            metadata['exposureMode'] = modes.get(exposure_mode, f'Unknown ({exposure_mode})')
+        
+        exposure_program = get_exif_value('ExposureProgram')
+        if exposure_program is not None:
+            programs = {
+                0: 'Not defined', 1: 'Manual', 2: 'Program AE',
+                3: 'Aperture-priority AE', 4: 'Shutter speed priority AE',
+                5: 'Creative (Slow speed)', 6: 'Action (High speed)',
+                7: 'Portrait', 8: 'Landscape'
+            }
+            metadata['exposureProgram'] = programs.get(exposure_program, f'Unknown ({exposure_program})')
+        
+        exposure_bias = get_exif_value('ExposureBiasValue')
+        if exposure_bias:
+            bias = format_rational(exposure_bias)
+            if bias is not None:
+                metadata['exposureBias'] = f"{bias:+.1f} EV"
+        
+        metering_mode = get_exif_value('MeteringMode')
+        if metering_mode is not None:
+            modes = {
+                0: 'Unknown', 1: 'Average', 2: 'Center-weighted average',
+                3: 'Spot', 4: 'Multi-spot', 5: 'Multi-segment', 6: 'Partial'
+            }
+            metadata['meteringMode'] = modes.get(metering_mode, f'Unknown ({metering_mode})')
+        
+        # Flash & Lighting
+        flash = get_exif_value('Flash')
+        if flash is not None:
+            flash_fired = flash & 0x01
+            flash_modes = {
+                0x00: 'No flash', 0x01: 'Fired',
+                0x05: 'Fired, Return not detected',
+                0x07: 'Fired, Return detected',
+                0x09: 'Yes, compulsory', 0x0D: 'Yes, compulsory, return not detected',
+                0x0F: 'Yes, compulsory, return detected',
+                0x10: 'No, compulsory', 0x18: 'No, auto',
+                0x19: 'Yes, auto', 0x1D: 'Yes, auto, return not detected',
+                0x1F: 'Yes, auto, return detected'
+            }
+            metadata['flash'] = flash_modes.get(flash, f'Flash ({flash})')
+        
+        white_balance = get_exif_value('WhiteBalance')
+        if white_balance is not None:
+            wb_modes = {0: 'Auto', 1: 'Manual'}
+            metadata['whiteBalance'] = wb_modes.get(white_balance, f'Unknown ({white_balance})')
+        
+        light_source = get_exif_value('LightSource')
+        if light_source is not None:
+            sources = {
+                0: 'Unknown', 1: 'Daylight', 2: 'Fluorescent',
+                3: 'Tungsten', 4: 'Flash', 9: 'Fine weather',
+                10: 'Cloudy', 11: 'Shade', 12: 'Daylight fluorescent',
+                13: 'Day white fluorescent', 14: 'Cool white fluorescent',
+                15: 'White fluorescent', 17: 'Standard light A',
+                18: 'Standard light B', 19: 'Standard light C',
+                20: 'D55', 21: 'D65', 22: 'D75', 23: 'D50',
+                24: 'ISO studio tungsten', 255: 'Other'
+            }
+            metadata['lightSource'] = sources.get(light_source, f'Unknown ({light_source})')
+        
+        # Focus Settings
+        focus_mode = get_exif_value('FocusMode')
+        if focus_mode:
+            metadata['focusMode'] = str(focus_mode)
+        
+        subject_distance = get_exif_value('SubjectDistance')
+        if subject_distance:
+            dist = format_rational(subject_distance)
+            if dist:
+                metadata['subjectDistance'] = f"{dist:.2f}m"
+        
+        subject_distance_range = get_exif_value('SubjectDistanceRange')
+        if subject_distance_range is not None:
+            ranges = {0: 'Unknown', 1: 'Macro', 2: 'Close', 3: 'Distant'}
+            metadata['subjectDistanceRange'] = ranges.get(subject_distance_range, f'Unknown ({subject_distance_range})')
+        
+        # Date & Time
+        date_time_original = get_exif_value('DateTimeOriginal')
+        if date_time_original:
+            metadata['dateTimeOriginal'] = str(date_time_original)
+        
+        date_time_digitized = get_exif_value('DateTimeDigitized')
+        if date_time_digitized:
+            metadata['dateTimeDigitized'] = str(date_time_digitized)
+        
+        date_time = get_exif_value('DateTime')
+        if date_time:
+            metadata['dateTime'] = str(date_time)
+        
+        # Author & Copyright
+        artist = get_exif_value('Artist')
+        if artist:
+            metadata['artist'] = str(artist).strip()
+            metadata['author'] = str(artist).strip()
+        
+        copyright_info = get_exif_value('Copyright')
+        if copyright_info:
+            metadata['copyright'] = str(copyright_info).strip()
+        
+        # Software
+        software = get_exif_value('Software')
+        if software:
+            metadata['software'] = str(software).strip()
+        
+        # Image Quality Settings
+        contrast = get_exif_value('Contrast')
+        if contrast is not None:
+            contrasts = {0: 'Normal', 1: 'Low', 2: 'High'}
+            metadata['contrast'] = contrasts.get(contrast, f'Unknown ({contrast})')
+        
+        saturation = get_exif_value('Saturation')
+        if saturation is not None:
+            saturations = {0: 'Normal', 1: 'Low', 2: 'High'}
+            metadata['saturation'] = saturations.get(saturation, f'Unknown ({saturation})')
+        
+        sharpness = get_exif_value('Sharpness')
+        if sharpness is not None:
+            sharpnesses = {0: 'Normal', 1: 'Soft', 2: 'Hard'}
+            metadata['sharpness'] = sharpnesses.get(sharpness, f'Unknown ({sharpness})')
+        
+        brightness = get_exif_value('BrightnessValue')
+        if brightness:
+            bright = format_rational(brightness)
+            if bright is not None:
+                metadata['brightness'] = f"{bright:.2f}"
+        
+        gain_control = get_exif_value('GainControl')
+        if gain_control is not None:
+            gains = {0: 'None', 1: 'Low gain up', 2: 'High gain up', 3: 'Low gain down', 4: 'High gain down'}
+            metadata['gainControl'] = gains.get(gain_control, f'Unknown ({gain_control})')
+        
+        digital_zoom = get_exif_value('DigitalZoomRatio')
+        if digital_zoom:
+            zoom = format_rational(digital_zoom)
+            if zoom:
+                metadata['digitalZoomRatio'] = f"{zoom:.2f}x"
+        
+        # Scene Information
+        scene_type = get_exif_value('SceneType')
+        if scene_type:
+            metadata['sceneType'] = str(scene_type)
+        
+        scene_capture_type = get_exif_value('SceneCaptureType')
+        if scene_capture_type is not None:
+            scenes = {0: 'Standard', 1: 'Landscape', 2: 'Portrait', 3: 'Night'}
+            metadata['sceneCaptureType'] = scenes.get(scene_capture_type, f'Unknown ({scene_capture_type})')
+        
+        # GPS Information
+        gps_info = get_exif_value('GPSInfo')
+        if gps_info:
+            try:
+                # Extract GPS coordinates
+                def convert_to_degrees(value):
+                    d = float(value[0])
+                    m = float(value[1])
+                    s = float(value[2])
+                    return d + (m / 60.0) + (s / 3600.0)
+                
+                if 2 in gps_info and 4 in gps_info:  # Latitude and Longitude
+                    lat = convert_to_degrees(gps_info[2])
+                    if gps_info[1] == 'S':
+                        lat = -lat
                     
-                    if 2 in gps_info and 4 in gps_info:  # Latitude and Longitude
-                        lat = convert_to_degrees(gps_info[2])
-                        if gps_info[1] == 'S':
-                            lat = -lat
-                        
-                        lon = convert_to_degrees(gps_info[4])
-                        if gps_info[3] == 'W':
-                            lon = -lon
-                        
-                        metadata['gpsLatitude'] = lat
-                        metadata['gpsLongitude'] = lon
-                        metadata['gpsLocation'] = f"{lat:.6f}, {lon:.6f}"
+                    lon = convert_to_degrees(gps_info[4])
+                    if gps_info[3] == 'W':
+                        lon = -lon
                     
-                    if 6 in gps_info:  # Altitude
-                        alt = format_rational(gps_info[6])
-                        if alt:
-                            metadata['gpsAltitude'] = alt
-                except Exception as e:
-                    logger.warning(f'Error extracting GPS data: {str(e)}')
-            
-            logger.info(f'Extracted comprehensive EXIF data with {len(metadata)} fields')
-            return metadata
-            
+                    metadata['gpsLatitude'] = lat
+                    metadata['gpsLongitude'] = lon
+                    metadata['gpsLocation'] = f"{lat:.6f}, {lon:.6f}"
+                
+                if 6 in gps_info:  # Altitude
+                    alt = format_rational(gps_info[6])
+                    if alt:
+                        metadata['gpsAltitude'] = alt
+            except Exception as e:
+                logger.warning(f'Error extracting GPS data: {str(e)}')
+        
+        logger.info(f'Extracted comprehensive EXIF data with {len(metadata)} fields')
+        return metadata
+        
     except Exception as e:
         logger.warning(f'Could not extract EXIF data: {str(e)}')
         return {}
 
-def process_image(file, filename):
-    """Process uploaded image file"""
+GPS_METADATA_FIELDS = ('gpsLatitude', 'gpsLongitude', 'gpsLocation', 'gpsAltitude')
+
+def extract_gps_metadata(image_path):
+    """Extract only the GPS fields of extract_exif_data"""
+    metadata = extract_exif_data(image_path)
+    return {key: metadata[key] for key in GPS_METADATA_FIELDS if key in metadata}
+
+# DCT-II basis for the 32x32 pHash input, computed once
+PHASH_SIZE = 32
+PHASH_LOW_FREQ = 8
+_dct_index = np.arange(PHASH_SIZE)
+DCT_MATRIX = np.cos(np.pi * np.outer(_dct_index, 2 * _dct_index + 1) / (2 * PHASH_SIZE))
+
+def bits_to_int(bits):
+    """Pack a boolean array into an integer, most significant bit first"""
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+def compute_perceptual_hash(image_source):
+    """Compute 64-bit pHash and dHash of an image (path or file object)"""
+    with Image.open(image_source) as img:
+        gray = ImageOps.exif_transpose(img).convert('L')
+
+        # pHash: low-frequency DCT coefficients compared to their median
+        small = gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS)
+        pixels = np.asarray(small, dtype=np.float64)
+        dct = DCT_MATRIX @ pixels @ DCT_MATRIX.T
+        low_freq = dct[:PHASH_LOW_FREQ, :PHASH_LOW_FREQ].flatten()
+        # Skip the DC term so overall brightness does not skew the median
+        median = np.median(low_freq[1:])
+        phash = bits_to_int(low_freq > median)
+
+        # dHash: horizontal gradient sign on a 9x8 grid
+        small = gray.resize((9, 8), Image.Resampling.LANCZOS)
+        pixels = np.asarray(small, dtype=np.int16)
+        dhash = bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+    return {'phash': f'{phash:016x}', 'dhash': f'{dhash:016x}'}
+
+def popcount64(values):
+    """Count set bits of a uint64 array (SWAR, no np.bitwise_count in NumPy 1.x)"""
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (values * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+def to_sqlite_int64(value):
+    """Map an unsigned 64-bit hash onto SQLite's signed INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+class PerceptualHashIndex:
+    """Hamming-distance index over 64-bit perceptual hashes (multi-index hashing).
+
+    Each hash is split into 4 chunks of 16 bits. Two hashes within distance r
+    agree to within r // 4 bits on at least one chunk, so a query only probes
+    the chunk values near its own and checks those candidates' full distance.
+
+    Hashes are persisted in the `phashes` table of the asset database. In
+    memory they are NumPy arrays: hashes (uint64) and row ids in row order,
+    plus per chunk the sorted chunk values (uint16) and their positions
+    (uint32), about 40 bytes per entry. Probes are binary searches and
+    candidates are checked with a vectorized XOR + popcount. Rows added since
+    the last merge sit in a short tail that is scanned linearly.
+
+    New rows are read incrementally by row id, so every worker process sees
+    new uploads. Re-adding a filename replaces its row; the old row id no
+    longer resolves to a filename and is skipped.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+    MAX_THRESHOLD = 16
+    MERGE_SIZE = 4096
+    NAME_BATCH = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._keys = [np.empty(0, dtype=np.uint16) for _ in range(self.CHUNKS)]
+        self._positions = [np.empty(0, dtype=np.uint32) for _ in range(self.CHUNKS)]
+        self._tail_hashes = np.empty(0, dtype=np.uint64)
+        self._tail_ids = np.empty(0, dtype=np.int64)
+        self._last_id = 0
+        self._masks = {}
+
+    def _chunk_keys(self, hashes, chunk):
+        shift = np.uint64(chunk * self.CHUNK_BITS)
+        return ((hashes >> shift) & np.uint64((1 << self.CHUNK_BITS) - 1)).astype(np.uint16)
+
+    def _merge(self):
+        """Fold the tail into the sorted chunk arrays"""
+        self._hashes = np.concatenate([self._hashes, self._tail_hashes])
+        self._ids = np.concatenate([self._ids, self._tail_ids])
+        self._tail_hashes = np.empty(0, dtype=np.uint64)
+        self._tail_ids = np.empty(0, dtype=np.int64)
+        for chunk in range(self.CHUNKS):
+            keys = self._chunk_keys(self._hashes, chunk)
+            order = np.argsort(keys, kind='stable').astype(np.uint32)
+            self._keys[chunk] = keys[order]
+            self._positions[chunk] = order
+
+    def _sync(self, conn):
+        """Load rows added to the table since the last read"""
+        rows = np.fromiter(
+            conn.execute('SELECT id, phash FROM phashes WHERE id > ? ORDER BY id', (self._last_id,)),
+            dtype=[('id', np.int64), ('phash', np.int64)]
+        )
+        if not len(rows):
+            return
+        self._last_id = int(rows['id'][-1])
+        self._tail_ids = np.concatenate([self._tail_ids, rows['id']])
+        self._tail_hashes = np.concatenate([self._tail_hashes, rows['phash'].view(np.uint64)])
+        if len(self._tail_ids) >= self.MERGE_SIZE:
+            self._merge()
+
+    def _flip_masks(self, radius):
+        """All chunk-sized bit masks with at most `radius` bits set"""
+        if radius not in self._masks:
+            masks = []
+            for count in range(radius + 1):
+                for positions in combinations(range(self.CHUNK_BITS), count):
+                    mask = 0
+                    for position in positions:
+                        mask |= 1 << position
+                    masks.append(mask)
+            self._masks[radius] = np.array(masks, dtype=np.uint16)
+        return self._masks[radius]
+
+    def _candidates(self, value, radius, keys_by_chunk, positions_by_chunk):
+        """Positions of merged entries sharing a chunk within `radius` bits"""
+        masks = self._flip_masks(radius)
+        found = []
+        for chunk, keys in enumerate(keys_by_chunk):
+            probes = self._chunk_keys(np.uint64(value), chunk) ^ masks
+            low = np.searchsorted(keys, probes, side='left')
+            counts = np.searchsorted(keys, probes, side='right') - low
+            low, counts = low[counts > 0], counts[counts > 0]
+            if not len(counts):
+                continue
+            # Expand the [low, low + count) ranges without a Python loop
+            starts = np.repeat(low - np.cumsum(counts) + counts, counts)
+            found.append(positions_by_chunk[chunk][starts + np.arange(counts.sum())])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.uint32)
+
+    def _filenames(self, conn, ids):
+        names = []
+        for start in range(0, len(ids), self.NAME_BATCH):
+            batch = ids[start:start + self.NAME_BATCH]
+            names.extend(row[0] for row in conn.execute(
+                f"SELECT filename FROM phashes WHERE id IN ({', '.join('?' * len(batch))})", batch
+            ))
+        return names
+
+    def _connect(self):
+        conn = connect_asset_db()
+        conn.row_factory = None
+        return conn
+
+    def add(self, filename, hash_hex):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO phashes (filename, phash) VALUES (?, ?)',
+                    (filename, to_sqlite_int64(int(hash_hex, 16)))
+                )
+        finally:
+            conn.close()
+
+    def get(self, filename):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT phash FROM phashes WHERE filename = ?', (filename,)).fetchone()
+        finally:
+            conn.close()
+        return f'{row[0] & 0xFFFFFFFFFFFFFFFF:016x}' if row else None
+
+    def search(self, hash_hex, threshold, limit=50):
+        """Return [(filename, distance)] within `threshold` bits, closest first"""
+        threshold = max(0, min(threshold, self.MAX_THRESHOLD))
+        value = int(hash_hex, 16)
+
+        conn = self._connect()
+        try:
+            with self._lock:
+                self._sync(conn)
+                # Merging replaces the arrays rather than mutating them
+                hashes, ids, keys, positions = self._hashes, self._ids, self._keys, self._positions
+                tail_hashes, tail_ids = self._tail_hashes, self._tail_ids
+
+            positions = self._candidates(value, threshold // self.CHUNKS, keys, positions)
+            distances = popcount64(hashes[positions] ^ np.uint64(value))
+            tail_distances = popcount64(tail_hashes ^ np.uint64(value))
+            ids = np.concatenate([ids[positions[distances <= threshold]],
+                                  tail_ids[tail_distances <= threshold]])
+            distances = np.concatenate([distances[distances <= threshold],
+                                        tail_distances[tail_distances <= threshold]])
+            # A row is found once per matching chunk
+            ids, unique = np.unique(ids, return_index=True)
+            distances = distances[unique]
+
+            matches = []
+            for distance in np.unique(distances):
+                names = self._filenames(conn, ids[distances == distance].tolist())
+                matches.extend((name, int(distance)) for name in sorted(names))
+                if len(matches) >= limit:
+                    break
+        finally:
+            conn.close()
+        return matches[:limit]
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM phashes').fetchone()[0]
+        finally:
+            conn.close()
+
+phash_index = PerceptualHashIndex()
+
+def backfill_perceptual_hashes(limit=None):
+    """Hash existing thumbnails that are not in the near-duplicate index yet"""
+    thumbnails_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'thumbnails')
+    suffix = '_thumb.jpg'
+    indexed = 0
+    failed = 0
+
+    with os.scandir(thumbnails_dir) as entries:
+        for entry in entries:
+            if limit is not None and indexed >= limit:
+                break
+            if not entry.name.endswith(suffix):
+                continue
+
+            original_filename = f"{entry.name[:-len(suffix)]}.jpg"
+            if phash_index.get(original_filename) is not None:
+                continue
+
+            try:
+                hashes = compute_perceptual_hash(entry.path)
+                phash_index.add(original_filename, hashes['phash'])
+                indexed += 1
+            except Exception as e:
+                logger.warning(f'Could not hash thumbnail {entry.name}: {str(e)}')
+                failed += 1
+
+    logger.info(f'Back-filled perceptual hashes: {indexed} indexed, {failed} failed')
+    return {'indexed': indexed, 'failed': failed, 'total': len(phash_index)}
+
+# Asset metadata index: frequently filtered EXIF fields get their own indexed
+# columns, the complete metadata dict is kept as JSON in `metadata`.
+ASSET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    original TEXT NOT NULL,
+    thumbnail TEXT NOT NULL,
+    tiles TEXT,
+    width INTEGER,
+    height INTEGER,
+    content_hash TEXT,
+    phash TEXT,
+    camera_make TEXT COLLATE NOCASE,
+    camera_model TEXT COLLATE NOCASE,
+    lens_model TEXT COLLATE NOCASE,
+    iso INTEGER,
+    date_taken TEXT,
+    created_at TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_created ON assets (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_assets_camera_make ON assets (camera_make, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_assets_camera_model ON assets (camera_model, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_assets_lens ON assets (lens_model, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_assets_iso ON assets (iso);
+CREATE INDEX IF NOT EXISTS idx_assets_date_taken ON assets (date_taken);
+CREATE INDEX IF NOT EXISTS idx_assets_content_hash ON assets (content_hash);
+-- Near-duplicate index; the hash is the unsigned pHash stored as signed int64
+CREATE TABLE IF NOT EXISTS phashes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL UNIQUE,
+    phash INTEGER NOT NULL
+);
+"""
+
+ASSET_COLUMNS = ('id', 'filename', 'original', 'thumbnail', 'tiles', 'width', 'height',
+                 'content_hash', 'phash', 'camera_make', 'camera_model', 'lens_model',
+                 'iso', 'date_taken', 'created_at', 'metadata')
+
+def connect_asset_db():
+    conn = sqlite3.connect(app.config['ASSET_DB_PATH'], timeout=30)
+    conn.row_factory = sqlite3.Row
+    # WAL lets the gunicorn workers read while another one is writing
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+def init_asset_db():
+    with connect_asset_db() as conn:
+        conn.executescript(ASSET_SCHEMA)
+    conn.close()
+
+def get_asset_db():
+    """Get SQLite connection for the current app context"""
+    if 'asset_db' not in g:
+        g.asset_db = connect_asset_db()
+    return g.asset_db
+
+@app.teardown_appcontext
+def close_asset_db(error):
+    conn = g.pop('asset_db', None)
+    if conn is not None:
+        conn.close()
+
+init_asset_db()
+
+def parse_exif_datetime(value):
+    """Convert EXIF 'YYYY:MM:DD HH:MM:SS' to ISO 8601, or None"""
+    try:
+        return datetime.strptime(str(value).strip(), '%Y:%m:%d %H:%M:%S').isoformat()
+    except (TypeError, ValueError):
+        return None
+
+def index_asset(asset_id, result, content_hash):
+    """Store processed image and its metadata in the asset index"""
+    metadata = result['metadata']
+    iso = metadata.get('iso')
+    row = {
+        'id': asset_id,
+        'filename': result['filename'],
+        'original': result['original'],
+        'thumbnail': result['thumbnail'],
+        'tiles': result.get('tiles'),
+        'width': metadata.get('width'),
+        'height': metadata.get('height'),
+        'content_hash': content_hash,
+        'phash': result['perceptualHash']['phash'],
+        'camera_make': metadata.get('cameraMake'),
+        'camera_model': metadata.get('cameraModel'),
+        'lens_model': metadata.get('lensModel'),
+        'iso': iso if isinstance(iso, int) else None,
+        'date_taken': parse_exif_datetime(metadata.get('dateTimeOriginal') or metadata.get('dateTime')),
+        'created_at': datetime.now().isoformat(),
+        'metadata': json.dumps(metadata, default=str)
+    }
+    conn = get_asset_db()
+    with conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO assets ({', '.join(ASSET_COLUMNS)}) "
+            f"VALUES ({', '.join(':' + column for column in ASSET_COLUMNS)})",
+            row
+        )
+
+def asset_from_row(row):
+    return {
+        'id': row['id'],
+        'filename': row['filename'],
+        'original': row['original'],
+        'thumbnail': row['thumbnail'],
+        'tiles': row['tiles'],
+        'width': row['width'],
+        'height': row['height'],
+        'contentHash': row['content_hash'],
+        'phash': row['phash'],
+        'createdAt': row['created_at'],
+        'metadata': json.loads(row['metadata'])
+    }
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(f"{row['created_at']}|{row['id']}".encode()).decode()
+
+def decode_cursor(cursor):
+    created_at, asset_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+    return created_at, asset_id
+
+# Priority classes, with their share of the worker pool when all are busy
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+PRIORITY_BACKGROUND = 'background'
+PRIORITY_WEIGHTS = {PRIORITY_INTERACTIVE: 8, PRIORITY_BULK: 2, PRIORITY_BACKGROUND: 1}
+
+class WorkScheduler:
+    """Weighted fair scheduler for image processing jobs.
+
+    Jobs are queued per priority class and run on a fixed pool of worker
+    threads. The next class is picked by stride scheduling: each dispatch
+    advances the class's pass by 1 / weight and the lowest pass wins, so
+    busy classes share the pool in proportion to their weights. Each user
+    may run at most `user_concurrency` jobs per class (jobs without a user
+    id are not capped), and `reserved`
+    workers only take interactive jobs so single uploads never wait behind
+    a pool full of long RAW conversions.
+    """
+
+    LATENCY_WINDOW = 1000
+
+    def __init__(self, workers, weights, user_concurrency, reserved=0):
+        if workers <= reserved:
+            # Otherwise a single bulk job could take the only worker
+            logger.warning(
+                f'{workers} processing workers with {reserved} reserved for interactive jobs '
+                f'leave none for other jobs; using {reserved + 1} workers'
+            )
+            workers = reserved + 1
+        self.workers = workers
+        self.weights = weights
+        self.user_concurrency = user_concurrency
+        self.shared_workers = workers - reserved
+        self._cond = threading.Condition()
+        self._queues = {priority: deque() for priority in weights}
+        self._pass = {priority: 0.0 for priority in weights}
+        self._virtual_time = 0.0
+        self._running = {priority: 0 for priority in weights}
+        self._running_per_user = defaultdict(int)
+        self._completed = {priority: 0 for priority in weights}
+        self._failed = {priority: 0 for priority in weights}
+        self._cancelled = {priority: 0 for priority in weights}
+        self._wait_times = {priority: deque(maxlen=self.LATENCY_WINDOW) for priority in weights}
+        self._latencies = {priority: deque(maxlen=self.LATENCY_WINDOW) for priority in weights}
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f'scheduler-{i}', daemon=True).start()
+
+    def submit(self, priority, user_id, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return a Future for its result"""
+        job = {
+            'fn': fn,
+            'args': args,
+            'kwargs': kwargs,
+            'user_id': None if user_id is None else str(user_id),
+            'future': Future(),
+            'enqueued_at': time.monotonic()
+        }
+        with self._cond:
+            queue = self._queues[priority]
+            if not queue:
+                # A class that was idle must not catch up on the shares it skipped
+                self._pass[priority] = max(self._pass[priority], self._virtual_time)
+            queue.append(job)
+            self._cond.notify()
+        return job['future']
+
+    def _can_run(self, priority):
+        if priority == PRIORITY_INTERACTIVE:
+            return True
+        running = sum(count for p, count in self._running.items() if p != PRIORITY_INTERACTIVE)
+        return running < self.shared_workers
+
+    def _next_job(self):
+        """Pop the next runnable job, or None. Caller must hold the lock."""
+        best_priority = None
+        best_index = None
+        for priority, queue in self._queues.items():
+            if not queue or not self._can_run(priority):
+                continue
+            if best_priority is not None and self._pass[priority] >= self._pass[best_priority]:
+                continue
+            for index, job in enumerate(queue):
+                if (job['user_id'] is None or
+                        self._running_per_user[(priority, job['user_id'])] < self.user_concurrency):
+                    best_priority, best_index = priority, index
+                    break
+
+        if best_priority is None:
+            return None, None
+
+        queue = self._queues[best_priority]
+        job = queue[best_index]
+        del queue[best_index]
+        self._virtual_time = self._pass[best_priority]
+        self._pass[best_priority] += 1.0 / self.weights[best_priority]
+        return best_priority, job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                priority, job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    priority, job = self._next_job()
+                user_key = (priority, job['user_id']) if job['user_id'] is not None else None
+                self._running[priority] += 1
+                if user_key:
+                    self._running_per_user[user_key] += 1
+
+            started_at = time.monotonic()
+            future = job['future']
+            result = error = None
+            run = future.set_running_or_notify_cancel()
+            if run:
+                try:
+                    with app.app_context():
+                        result = job['fn'](*job['args'], **job['kwargs'])
+                except BaseException as e:
+                    error = e
+            finished_at = time.monotonic()
+
+            with self._cond:
+                self._running[priority] -= 1
+                if user_key:
+                    self._running_per_user[user_key] -= 1
+                    if not self._running_per_user[user_key]:
+                        del self._running_per_user[user_key]
+                if not run:
+                    # Cancelled while queued: never ran, so no latency samples
+                    self._cancelled[priority] += 1
+                else:
+                    if error is not None:
+                        self._failed[priority] += 1
+                    else:
+                        self._completed[priority] += 1
+                    self._wait_times[priority].append(started_at - job['enqueued_at'])
+                    self._latencies[priority].append(finished_at - job['enqueued_at'])
+                # Finishing may unblock a capped user or a shared-pool class
+                self._cond.notify_all()
+
+            # Publish after bookkeeping so stats already include this job
+            if run:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    @staticmethod
+    def _percentiles(samples):
+        if not samples:
+            return {'p50': None, 'p99': None}
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+        return {'p50': pick(0.50), 'p99': pick(0.99)}
+
+    def stats(self):
+        """Queue depth, running jobs and latency (ms) per priority class"""
+        with self._cond:
+            return {
+                priority: {
+                    'weight': self.weights[priority],
+                    'queued': len(self._queues[priority]),
+                    'running': self._running[priority],
+                    'completed': self._completed[priority],
+                    'failed': self._failed[priority],
+                    'cancelled': self._cancelled[priority],
+                    'waitMs': self._percentiles(self._wait_times[priority]),
+                    'latencyMs': self._percentiles(self._latencies[priority])
+                }
+                for priority in self.weights
+            }
+
+scheduler = WorkScheduler(
+    app.config['PROCESSING_WORKERS'],
+    PRIORITY_WEIGHTS,
+    app.config['USER_CONCURRENCY'],
+    reserved=app.config['RESERVED_INTERACTIVE_WORKERS']
+)
+
+if not app.config['JWT_SECRET']:
+    logger.warning('JWT_SECRET is not set: per-user scheduling limits are disabled')
+
+def get_request_user_id():
+    """Verified uploader id (JWT sub) for per-user scheduling limits, or None.
+
+    Client-supplied ids and the remote address are not used: behind the
+    NestJS proxy every request shares one address, which would turn the
+    per-user cap into a global one.
+    """
+    if not app.config['JWT_SECRET']:
+        return None
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        logger.warning(f'No bearer token on {request.path}: per-user limit not applied')
+        return None
+    try:
+        payload = jwt.decode(auth_header[7:], app.config['JWT_SECRET'], algorithms=['HS256'])
+    except jwt.InvalidTokenError as e:
+        logger.warning(f'Invalid bearer token on {request.path}: {str(e)}')
+        return None
+    if not payload.get('sub'):
+        logger.warning(f'Bearer token without sub on {request.path}: per-user limit not applied')
+        return None
+    return str(payload['sub'])
+
+class ChunkedUploadStore:
+    """Disk-backed state for resumable (tus-like) uploads.
+
+    Each upload is `<id>.part`, holding the bytes received so far (its size
+    is the current offset), plus `<id>.json` with the filename, total size,
+    options and status: uploading -> processing -> done / failed. SHA-256 is
+    updated as chunks arrive, so the finished file never needs a second
+    read; after a restart it is rebuilt from the part.
+
+    Processing moves the part away; the info file then keeps the result (or
+    error) so finalize can be retried until the upload expires. The newest
+    mtime of the two files is the last activity the TTL counts from.
+    """
+
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._upload_locks = {}
+        self._hashers = {}
+        self._jobs = {}
+
+    def part_path(self, upload_id):
+        return os.path.join(self.directory, f'{upload_id}.part')
+
+    def _info_path(self, upload_id):
+        return os.path.join(self.directory, f'{upload_id}.json')
+
+    def _write_info(self, info):
+        """Atomically replace the info file, which also touches its mtime"""
+        path = self._info_path(info['id'])
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({key: value for key, value in info.items()
+                       if key not in ('offset', 'expiresAt')}, f)
+        os.replace(f'{path}.tmp', path)
+
+    def _last_activity(self, upload_id):
+        mtimes = []
+        for path in (self.part_path(upload_id), self._info_path(upload_id)):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except FileNotFoundError:
+                pass
+        return max(mtimes) if mtimes else None
+
+    def create(self, filename, size, user_id, tiled=False, sha256=None):
+        upload_id = uuid.uuid4().hex
+        info = {
+            'id': upload_id,
+            'filename': filename,
+            'size': size,
+            'userId': user_id,
+            'tiled': tiled,
+            'sha256': sha256.lower() if sha256 else None,
+            'status': 'uploading',
+            'createdAt': datetime.now().isoformat()
+        }
+        open(self.part_path(upload_id), 'wb').close()
+        self._write_info(info)
+        with self._lock:
+            self._hashers[upload_id] = hashlib.sha256()
+        return self.get(upload_id)
+
+    def get(self, upload_id):
+        """Return upload info with current offset, or None if unknown/expired"""
+        if not upload_id or secure_filename(upload_id) != upload_id:
+            return None
+        try:
+            with open(self._info_path(upload_id), encoding='utf-8') as f:
+                info = json.load(f)
+            if info['status'] == 'uploading':
+                info['offset'] = os.path.getsize(self.part_path(upload_id))
+            else:
+                info['offset'] = info['size']
+        except (FileNotFoundError, ValueError):
+            return None
+        last_activity = self._last_activity(upload_id) or time.time()
+        info['expiresAt'] = datetime.fromtimestamp(last_activity + self.ttl).isoformat()
+        return info
+
+    def update(self, upload_id, expected_status=None, **fields):
+        """Persist status fields (status, digest, result, error).
+
+        With expected_status this is a compare-and-set: nothing is written
+        and None is returned unless the upload is still in that status.
+        """
+        with self._lock:
+            info = self.get(upload_id)
+            if info is None or (expected_status and info['status'] != expected_status):
+                return None
+            info.update(fields)
+            self._write_info(info)
+        return info
+
+    def lock(self, upload_id):
+        """Per-upload lock so two PATCH requests cannot interleave writes"""
+        with self._lock:
+            return self._upload_locks.setdefault(upload_id, threading.Lock())
+
+    def _hasher(self, upload_id):
+        with self._lock:
+            hasher = self._hashers.get(upload_id)
+        if hasher is None:
+            hasher = hashlib.sha256()
+            with open(self.part_path(upload_id), 'rb') as f:
+                for chunk in iter(lambda: f.read(self.READ_SIZE), b''):
+                    hasher.update(chunk)
+            with self._lock:
+                self._hashers[upload_id] = hasher
+        return hasher
+
+    def append(self, upload_id, stream, max_bytes):
+        """Write up to max_bytes from stream to the part file.
+
+        Whatever arrived before a dropped connection is kept, so the client
+        can resume from the offset the store reports afterwards.
+        """
+        hasher = self._hasher(upload_id)
+        written = 0
+        with open(self.part_path(upload_id), 'ab') as f:
+            try:
+                while written < max_bytes:
+                    chunk = stream.read(min(self.READ_SIZE, max_bytes - written))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+            finally:
+                f.flush()
+        return written
+
+    def digest(self, upload_id):
+        return self._hasher(upload_id).hexdigest()
+
+    def set_job(self, upload_id, future):
+        with self._lock:
+            self._jobs[upload_id] = future
+
+    def get_job(self, upload_id):
+        with self._lock:
+            return self._jobs.get(upload_id)
+
+    def release(self, upload_id):
+        """Drop the hash state once the upload is complete"""
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+
+    def remove(self, upload_id):
+        for path in (self.part_path(upload_id), self._info_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._upload_locks.pop(upload_id, None)
+            self._jobs.pop(upload_id, None)
+
+    def expire(self):
+        """Delete uploads (and kept results) with no activity within the TTL"""
+        cutoff = time.time() - self.ttl
+        expired = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-len('.json')]
+            last_activity = self._last_activity(upload_id)
+            if last_activity is None:
+                continue
+            # Uploads whose processing job is still running are never expired
+            job = self.get_job(upload_id)
+            if last_activity < cutoff and (job is None or job.done()):
+                self.remove(upload_id)
+                expired += 1
+        if expired:
+            logger.info(f'Expired {expired} abandoned chunked uploads')
+        return expired
+
+upload_store = ChunkedUploadStore(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'chunks'),
+    app.config['CHUNKED_UPLOAD_TTL']
+)
+
+def expire_chunked_uploads_periodically(interval=3600):
+    while True:
+        time.sleep(interval)
+        scheduler.submit(PRIORITY_BACKGROUND, 'system', upload_store.expire)
+
+threading.Thread(target=expire_chunked_uploads_periodically, name='chunk-expiry', daemon=True).start()
+
+def process_image(file, filename, tiled=False, content_hash=None):
+    """Process uploaded image file (FileStorage or path of an assembled upload)
+
+    Large images (or tiled=True) are processed in tiled mode: streamed in
+    strips with bounded memory and published as a DeepZoom tile pyramid.
+    content_hash is the SHA-256 of the uploaded bytes; it is computed while
+    saving unless the caller (chunked upload) already has it.
+    """
     file_ext = filename.rsplit('.', 1)[1].lower()
     unique_filename = f"{uuid.uuid4().hex}_{int(datetime.now().timestamp())}"
     
@@ -409,11 +1574,11 @@ def process_image(file, filename):
     if is_raw:
         # Save RAW file temporarily
         temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f'temp_{unique_filename}.{file_ext}')
-        file.save(temp_path)
+        content_hash = save_upload(file, temp_path) or content_hash
         
         try:
             # Convert RAW to JPG
-            convert_raw_to_jpg(temp_path, original_path)
+            convert_raw_to_jpg(temp_path, original_path, baseline=tiled)
             
             # Remove temp RAW file
             os.remove(temp_path)
@@ -422,33 +1587,69 @@ def process_image(file, filename):
             if os.path.exists(temp_path):
                 os.remove(temp_path)
             raise e
+
+        tiled = tiled or is_large_image(original_path)
+        source_gps = {}
     else:
         # Save regular image directly
-        file.save(original_path)
+        content_hash = save_upload(file, original_path) or content_hash
+        tiled = tiled or is_large_image(original_path)
+
+        # GPS is stripped from the published original (STRIP_GPS) but still
+        # reported in the metadata, so read it before conversion
+        source_gps = extract_gps_metadata(original_path)
         
-        # Convert to JPG if needed
-        if file_ext not in ['jpg', 'jpeg']:
+        # Convert to JPG if needed (also PNG/WebP data uploaded as .jpg)
+        needs_conversion = file_ext not in ['jpg', 'jpeg'] or not is_jpeg_file(original_path)
+        if needs_conversion and tiled:
+            temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f'temp_{unique_filename}.{file_ext}')
+            os.replace(original_path, temp_path)
+            try:
+                convert_to_jpg_streaming(temp_path, original_path)
+            finally:
+                os.remove(temp_path)
+        elif needs_conversion:
             with Image.open(original_path) as img:
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                img.save(original_path, 'JPEG', quality=95)
+                encode_jpeg(img, original_path, img.getexif() or None)
+
+    # Apply orientation and metadata policy; compliant JPEGs are left as-is
+    encode_mode = normalize_jpeg(original_path, streaming=tiled)
+    logger.info(f'Encoded original ({encode_mode}): {original_filename}')
     
     # Create thumbnail
-    create_thumbnail(original_path, thumbnail_path, app.config['THUMBNAIL_HEIGHT'])
+    if tiled:
+        create_thumbnail_streaming(original_path, thumbnail_path, app.config['THUMBNAIL_HEIGHT'])
+        generate_tile_pyramid(original_path, unique_filename)
+    else:
+        create_thumbnail(original_path, thumbnail_path, app.config['THUMBNAIL_HEIGHT'])
     
     # Extract EXIF metadata
     exif_data = extract_exif_data(original_path)
-    
-    return {
+    exif_data.update(source_gps)
+
+    # Perceptual hash from the thumbnail (cheap to decode) for near-duplicate search
+    perceptual_hash = compute_perceptual_hash(thumbnail_path)
+    phash_index.add(original_filename, perceptual_hash['phash'])
+
+    result = {
+        'id': unique_filename,
         'original': f'/uploads/originals/{original_filename}',
         'thumbnail': f'/uploads/thumbnails/{thumbnail_filename}',
         'filename': original_filename,
-        'metadata': exif_data
+        'metadata': exif_data,
+        'perceptualHash': perceptual_hash,
+        'contentHash': content_hash
     }
+    if tiled:
+        result['tiles'] = f'/tiles/{unique_filename}.dzi'
+
+    # Persist metadata so it can be queried later without reopening the file
+    try:
+        index_asset(unique_filename, result, content_hash)
+    except Exception as e:
+        logger.error(f'Error indexing asset {unique_filename}: {str(e)}')
+
+    return result
 
 def read_signature_from_xmp(xmp_path):
     """Read existing signature from XMP file if exists"""
@@ -534,6 +1735,17 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     }), 200
 
+@app.route('/scheduler/stats', methods=['GET'])
+def scheduler_stats():
+    """Queue depth and latency metrics per priority class"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'workers': scheduler.workers,
+            'classes': scheduler.stats()
+        }
+    }), 200
+
 @app.route('/upload/single', methods=['POST'])
 def upload_single():
     """Upload and process single image"""
@@ -553,8 +1765,12 @@ def upload_single():
                 'error': f'File type not allowed. Supported: {", ".join(all_extensions)}'
             }), 400
         
-        # Process image
-        result = process_image(file, file.filename)
+        # Process image (tiled mode can be forced for zoomable viewers)
+        tiled = request.form.get('tiled', '').lower() in ('1', 'true', 'yes')
+        result = scheduler.submit(
+            PRIORITY_INTERACTIVE, get_request_user_id(),
+            process_image, file, file.filename, tiled=tiled
+        ).result()
         
         return jsonify({
             'success': True,
@@ -579,25 +1795,28 @@ def upload_multiple():
         
         results = []
         errors = []
+        jobs = []
+        user_id = get_request_user_id()
         
         for file in files:
+            if file.filename == '':
+                continue
+            
+            # Validate file extension
+            all_extensions = RAW_EXTENSIONS | IMAGE_EXTENSIONS
+            if not allowed_file(file.filename, all_extensions):
+                errors.append({
+                    'filename': file.filename,
+                    'error': 'File type not allowed'
+                })
+                continue
+            
+            # Queue as bulk work so single uploads are not stuck behind the batch
+            jobs.append((file, scheduler.submit(PRIORITY_BULK, user_id, process_image, file, file.filename)))
+        
+        for file, job in jobs:
             try:
-                if file.filename == '':
-                    continue
-                
-                # Validate file extension
-                all_extensions = RAW_EXTENSIONS | IMAGE_EXTENSIONS
-                if not allowed_file(file.filename, all_extensions):
-                    errors.append({
-                        'filename': file.filename,
-                        'error': 'File type not allowed'
-                    })
-                    continue
-                
-                # Process image
-                result = process_image(file, file.filename)
-                results.append(result)
-                
+                results.append(job.result())
             except Exception as e:
                 logger.error(f'Error processing file {file.filename}: {str(e)}')
                 errors.append({
@@ -620,6 +1839,213 @@ def upload_multiple():
         logger.error(f'Error uploading multiple files: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
+def chunked_upload_response(info, status=200):
+    response = jsonify({
+        'success': True,
+        'data': {
+            'id': info['id'],
+            'url': f"/upload/chunked/{info['id']}",
+            'filename': info['filename'],
+            'offset': info['offset'],
+            'size': info['size'],
+            'complete': info['offset'] >= info['size'],
+            'status': info['status'],
+            'expiresAt': info['expiresAt']
+        }
+    })
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(info['offset'])
+    response.headers['Upload-Length'] = str(info['size'])
+    return response
+
+def process_chunked_upload(info):
+    """Process an assembled upload and keep the outcome for finalize retries"""
+    upload_id = info['id']
+    try:
+        result = process_image(upload_store.part_path(upload_id), info['filename'],
+                               tiled=info['tiled'], content_hash=info['digest'])
+    except Exception as e:
+        upload_store.update(upload_id, status='failed', error=str(e))
+        raise
+    result['sha256'] = info['digest']
+    upload_store.update(upload_id, status='done', result=result)
+    return result
+
+def start_chunked_upload_job(info):
+    """Verify the assembled upload and queue it for processing.
+
+    Returns (info, digest) with the updated info, or (None, digest) on a
+    checksum mismatch. Only the caller that moves the upload out of its
+    current status queues a job; a concurrent caller gets the current info.
+    """
+    upload_id = info['id']
+    digest = info.get('digest') or upload_store.digest(upload_id)
+    if info['sha256'] and info['sha256'] != digest:
+        upload_store.remove(upload_id)
+        return None, digest
+    # Persisting the status also touches the info file, so the TTL counts
+    # from completion rather than from creation once the part is moved
+    claimed = upload_store.update(upload_id, expected_status=info['status'],
+                                  status='processing', digest=digest)
+    if claimed is None:
+        return upload_store.get(upload_id), digest
+    upload_store.release(upload_id)
+    job = scheduler.submit(PRIORITY_INTERACTIVE, claimed['userId'], process_chunked_upload, claimed)
+    upload_store.set_job(upload_id, job)
+    return claimed, digest
+
+@app.route('/upload/chunked', methods=['POST'])
+def create_chunked_upload():
+    """Start a resumable upload; chunks are then sent with PATCH"""
+    try:
+        data = request.get_json(silent=True) or request.form
+        filename = data.get('filename')
+        size = data.get('size') or request.headers.get('Upload-Length')
+
+        if not filename:
+            return jsonify({'error': 'No filename provided'}), 400
+
+        all_extensions = RAW_EXTENSIONS | IMAGE_EXTENSIONS
+        if not allowed_file(filename, all_extensions):
+            return jsonify({
+                'error': f'File type not allowed. Supported: {", ".join(all_extensions)}'
+            }), 400
+
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Upload size is required'}), 400
+        if size <= 0:
+            return jsonify({'error': 'Upload size must be positive'}), 400
+        if size > app.config['MAX_FILE_SIZE']:
+            return jsonify({'error': 'File too large'}), 413
+
+        tiled = str(data.get('tiled', '')).lower() in ('1', 'true', 'yes')
+        info = upload_store.create(filename, size, get_request_user_id(), tiled=tiled, sha256=data.get('sha256'))
+
+        logger.info(f"Created chunked upload {info['id']} for {filename} ({size} bytes)")
+        response = chunked_upload_response(info, 201)
+        response.headers['Location'] = f"/upload/chunked/{info['id']}"
+        return response
+
+    except Exception as e:
+        logger.error(f'Error creating chunked upload: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """Get upload offset to resume from (also answers HEAD)"""
+    info = upload_store.get(upload_id)
+    if info is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return chunked_upload_response(info)
+
+@app.route('/upload/chunked/<upload_id>', methods=['PATCH'])
+def upload_chunk(upload_id):
+    """Append a chunk at Upload-Offset; body is the raw chunk bytes"""
+    try:
+        if upload_store.get(upload_id) is None:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        lock = upload_store.lock(upload_id)
+        if not lock.acquire(blocking=False):
+            return jsonify({'error': 'Another chunk is being uploaded'}), 423
+
+        try:
+            # Re-read under the lock in case a concurrent chunk just finished
+            info = upload_store.get(upload_id)
+            if info is None:
+                return jsonify({'error': 'Upload not found'}), 404
+
+            try:
+                offset = int(request.headers['Upload-Offset'])
+            except (KeyError, ValueError):
+                return jsonify({'error': 'Upload-Offset header is required'}), 400
+
+            if offset != info['offset']:
+                response = jsonify({'error': 'Offset mismatch', 'offset': info['offset']})
+                response.status_code = 409
+                response.headers['Upload-Offset'] = str(info['offset'])
+                return response
+
+            remaining = info['size'] - offset
+            if request.content_length is not None and request.content_length > remaining:
+                return jsonify({'error': 'Chunk exceeds upload size'}), 413
+
+            # Read the raw body stream directly so nothing is spooled first
+            try:
+                upload_store.append(upload_id, request.stream, remaining)
+            except Exception as e:
+                logger.warning(f'Chunk for upload {upload_id} interrupted: {str(e)}')
+
+            info = upload_store.get(upload_id)
+            if info['offset'] >= info['size'] and info['status'] == 'uploading':
+                # Last chunk landed: start processing before finalize is called
+                info, digest = start_chunked_upload_job(info)
+                if info is None:
+                    return jsonify({'error': 'Checksum mismatch', 'sha256': digest}), 422
+
+            return chunked_upload_response(info)
+        finally:
+            lock.release()
+
+    except Exception as e:
+        logger.error(f'Error uploading chunk: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Wait for processing of a completed upload and return the result.
+
+    Idempotent: the result stays available until the upload expires, so a
+    client whose response got lost can simply call finalize again.
+    """
+    try:
+        if upload_store.get(upload_id) is None:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        # Same lock as PATCH, so the request sending the last chunk has
+        # either queued the job or not started when the status is checked
+        with upload_store.lock(upload_id):
+            info = upload_store.get(upload_id)
+            if info is None:
+                return jsonify({'error': 'Upload not found'}), 404
+            if info['offset'] < info['size']:
+                return chunked_upload_response(info, 409)
+
+            job = upload_store.get_job(upload_id)
+            if (info['status'] in ('uploading', 'processing') and job is None and
+                    os.path.exists(upload_store.part_path(upload_id))):
+                # Completed before a restart; processing was never queued or finished
+                info, digest = start_chunked_upload_job(info)
+                if info is None:
+                    return jsonify({'error': 'Checksum mismatch', 'sha256': digest}), 422
+                job = upload_store.get_job(upload_id)
+
+        if info['status'] in ('uploading', 'processing'):
+            if job is None:
+                info = upload_store.update(
+                    upload_id, expected_status=info['status'],
+                    status='failed', error='Processing was interrupted'
+                ) or upload_store.get(upload_id)
+            else:
+                try:
+                    job.result()
+                except Exception:
+                    pass  # Recorded in the upload info by process_chunked_upload
+                info = upload_store.get(upload_id)
+
+        if info['status'] == 'failed':
+            return jsonify({'error': info['error']}), 500
+        return jsonify({
+            'success': True,
+            'data': info['result']
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error finalizing chunked upload: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/upload/preset', methods=['POST'])
 def upload_preset():
     """Upload preset file with signature validation and ownership check"""
@@ -763,6 +2189,238 @@ def upload_preset():
             'code': 'UPLOAD_ERROR'
         }), 500
 
+def format_duplicates(matches):
+    return [
+        {
+            'filename': filename,
+            'original': f'/uploads/originals/{filename}',
+            'thumbnail': f"/uploads/thumbnails/{filename.rsplit('.', 1)[0]}_thumb.jpg",
+            'distance': distance
+        }
+        for filename, distance in matches
+    ]
+
+@app.route('/duplicates/<filename>', methods=['GET'])
+def find_duplicates(filename):
+    """Find near-duplicates of an already indexed image"""
+    try:
+        threshold = request.args.get('threshold', app.config['DUPLICATE_THRESHOLD'], type=int)
+        limit = request.args.get('limit', 50, type=int)
+
+        phash = phash_index.get(filename)
+        if phash is None:
+            return jsonify({'error': 'Image not found in duplicate index'}), 404
+
+        # Ask for one extra result since the image itself is always a match
+        matches = [
+            match for match in phash_index.search(phash, threshold, limit + 1)
+            if match[0] != filename
+        ][:limit]
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'filename': filename,
+                'phash': phash,
+                'threshold': threshold,
+                'duplicates': format_duplicates(matches)
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error searching duplicates: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/duplicates/search', methods=['POST'])
+def search_duplicates():
+    """Find near-duplicates of an uploaded image or a given pHash"""
+    try:
+        threshold = request.args.get('threshold', app.config['DUPLICATE_THRESHOLD'], type=int)
+        limit = request.args.get('limit', 50, type=int)
+
+        if 'file' in request.files and request.files['file'].filename != '':
+            phash = compute_perceptual_hash(request.files['file'].stream)['phash']
+        else:
+            phash = request.form.get('phash') or (request.get_json(silent=True) or {}).get('phash')
+            if not phash:
+                return jsonify({'error': 'No file or phash provided'}), 400
+            if not isinstance(phash, str) or not re.fullmatch(r'[0-9a-fA-F]{1,16}', phash):
+                return jsonify({'error': 'Invalid phash, expected 1-16 hex digits'}), 400
+            phash = f'{int(phash, 16):016x}'
+
+        matches = phash_index.search(phash, threshold, limit)
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'phash': phash,
+                'threshold': threshold,
+                'duplicates': format_duplicates(matches)
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error searching duplicates: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/duplicates/backfill', methods=['POST'])
+def backfill_duplicates():
+    """Index perceptual hashes for thumbnails uploaded before hashing existed"""
+    try:
+        limit = request.args.get('limit', type=int)
+        result = scheduler.submit(
+            PRIORITY_BACKGROUND, get_request_user_id(),
+            backfill_perceptual_hashes, limit
+        ).result()
+        return jsonify({'success': True, 'data': result}), 200
+    except Exception as e:
+        logger.error(f'Error back-filling perceptual hashes: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.cli.command('backfill-phash')
+def backfill_phash_command():
+    """Index perceptual hashes for all existing thumbnails"""
+    result = backfill_perceptual_hashes()
+    print(f"Indexed {result['indexed']} thumbnails ({result['failed']} failed), {result['total']} total")
+
+@app.route('/assets', methods=['GET'])
+def list_assets():
+    """Query asset index with filters, newest first, cursor-paginated"""
+    try:
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        filters = []
+        params = []
+
+        for arg, column in (('cameraMake', 'camera_make'), ('cameraModel', 'camera_model'),
+                            ('lensModel', 'lens_model'), ('contentHash', 'content_hash')):
+            value = request.args.get(arg)
+            if value:
+                filters.append(f'{column} = ?')
+                params.append(value)
+
+        iso_min = request.args.get('isoMin', type=int)
+        if iso_min is not None:
+            filters.append('iso >= ?')
+            params.append(iso_min)
+        iso_max = request.args.get('isoMax', type=int)
+        if iso_max is not None:
+            filters.append('iso <= ?')
+            params.append(iso_max)
+
+        # Dates are ISO 8601 strings, so plain string comparison is chronological
+        date_from = request.args.get('dateFrom')
+        if date_from:
+            filters.append('date_taken >= ?')
+            params.append(date_from)
+        date_to = request.args.get('dateTo')
+        if date_to:
+            # Inclusive for date-only values like 2024-01-31
+            filters.append('date_taken <= ?')
+            params.append(date_to if 'T' in date_to else f'{date_to}T23:59:59')
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                filters.append('(created_at, id) < (?, ?)')
+                params.extend(decode_cursor(cursor))
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        where = f"WHERE {' AND '.join(filters)}" if filters else ''
+        rows = get_asset_db().execute(
+            f'SELECT * FROM assets {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'assets': [asset_from_row(row) for row in rows],
+                'nextCursor': encode_cursor(rows[-1]) if has_more else None
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error querying assets: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/assets/<asset_id>', methods=['GET'])
+def get_asset(asset_id):
+    """Get single asset from the index"""
+    try:
+        row = get_asset_db().execute('SELECT * FROM assets WHERE id = ?', (asset_id,)).fetchone()
+        if row is None:
+            return jsonify({'error': 'Asset not found'}), 404
+        return jsonify({'success': True, 'data': asset_from_row(row)}), 200
+    except Exception as e:
+        logger.error(f'Error fetching asset: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/assets/batch', methods=['POST'])
+def get_assets_batch():
+    """Get many assets in one round trip, in the order of the requested ids"""
+    try:
+        ids = (request.get_json(silent=True) or {}).get('ids')
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'error': 'ids must be a non-empty list'}), 400
+        if len(ids) > 500:
+            return jsonify({'error': 'Too many ids (max 500)'}), 400
+
+        ids = [str(asset_id) for asset_id in ids]
+        placeholders = ', '.join('?' for _ in ids)
+        rows = get_asset_db().execute(
+            f'SELECT * FROM assets WHERE id IN ({placeholders})', ids
+        ).fetchall()
+        found = {row['id']: asset_from_row(row) for row in rows}
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'assets': [found[asset_id] for asset_id in ids if asset_id in found],
+                'missing': [asset_id for asset_id in ids if asset_id not in found]
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error fetching asset batch: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+def tile_pyramid_path(image_id):
+    """Return tiles directory path for image id, or None if id is invalid"""
+    if not image_id or secure_filename(image_id) != image_id:
+        return None
+    return os.path.join(app.config['UPLOAD_FOLDER'], 'tiles', image_id)
+
+@app.route('/tiles/<image_id>.dzi', methods=['GET'])
+def serve_tile_descriptor(image_id):
+    """Serve DeepZoom descriptor of a tile pyramid"""
+    try:
+        base_path = tile_pyramid_path(image_id)
+        if base_path and os.path.exists(f'{base_path}.dzi'):
+            return send_file(f'{base_path}.dzi', mimetype='application/xml', max_age=86400)
+        return jsonify({'error': 'Tile pyramid not found'}), 404
+    except Exception as e:
+        logger.error(f'Error serving tile descriptor: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/tiles/<image_id>/<int:level>/<int:col>_<int:row>.jpg', methods=['GET'])
+def serve_tile(image_id, level, col, row):
+    """Serve single tile of a tile pyramid"""
+    try:
+        base_path = tile_pyramid_path(image_id)
+        if base_path:
+            tile_path = os.path.join(f'{base_path}_files', str(level), f'{col}_{row}.jpg')
+            if os.path.exists(tile_path):
+                # Tiles never change once generated
+                return send_file(tile_path, mimetype='image/jpeg', max_age=31536000)
+        return jsonify({'error': 'Tile not found'}), 404
+    except Exception as e:
+        logger.error(f'Error serving tile: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/uploads/<path:filepath>', methods=['GET'])
 def serve_file(filepath):
     """Serve uploaded files"""
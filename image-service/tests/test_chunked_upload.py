@@ -0,0 +1,173 @@
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as image_service  # noqa: E402
+
+store = image_service.upload_store
+
+
+@pytest.fixture
+def client():
+    return image_service.app.test_client()
+
+
+@pytest.fixture(scope='module')
+def image_bytes():
+    buffer = io.BytesIO()
+    Image.effect_noise((200, 150), 50).convert('RGB').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def create(client, data, **fields):
+    response = client.post('/upload/chunked', json={'filename': 'photo.png', 'size': len(data), **fields})
+    assert response.status_code == 201
+    return response.get_json()['data']['id']
+
+
+def patch(client, upload_id, chunk, offset):
+    return client.patch(f'/upload/chunked/{upload_id}', data=chunk, headers={'Upload-Offset': str(offset)})
+
+
+class InterruptedStream(io.BytesIO):
+    """Request body that breaks off after its data, like a dropped connection"""
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            raise OSError('connection reset')
+        return data
+
+
+def test_create_reports_empty_upload(client, image_bytes):
+    response = client.post('/upload/chunked', json={'filename': 'photo.png', 'size': len(image_bytes)})
+    data = response.get_json()['data']
+    assert response.status_code == 201
+    assert response.headers['Location'] == f"/upload/chunked/{data['id']}"
+    assert (data['offset'], data['size'], data['status']) == (0, len(image_bytes), 'uploading')
+
+
+def test_offset_mismatch_returns_current_offset(client, image_bytes):
+    upload_id = create(client, image_bytes)
+    assert patch(client, upload_id, image_bytes[:1000], 0).status_code == 200
+    response = patch(client, upload_id, image_bytes[:1000], 0)
+    assert response.status_code == 409
+    assert response.headers['Upload-Offset'] == '1000'
+
+
+def test_resume_after_interrupted_chunk(client, image_bytes):
+    upload_id = create(client, image_bytes)
+    client.patch(
+        f'/upload/chunked/{upload_id}',
+        input_stream=InterruptedStream(image_bytes[:5000]),
+        headers={'Upload-Offset': '0', 'Content-Length': str(len(image_bytes))}
+    )
+    offset = int(client.head(f'/upload/chunked/{upload_id}').headers['Upload-Offset'])
+    assert offset == 5000
+
+    response = patch(client, upload_id, image_bytes[offset:], offset)
+    assert response.status_code == 200
+    assert response.get_json()['data']['status'] == 'processing'
+
+    result = client.post(f'/upload/chunked/{upload_id}/finalize').get_json()['data']
+    assert result['sha256'] == result['contentHash'] == hashlib.sha256(image_bytes).hexdigest()
+    assert result['metadata']['dimensions'] == '200x150'
+
+
+def test_finalize_incomplete_upload_is_rejected(client, image_bytes):
+    upload_id = create(client, image_bytes)
+    patch(client, upload_id, image_bytes[:100], 0)
+    assert client.post(f'/upload/chunked/{upload_id}/finalize').status_code == 409
+
+
+def test_checksum_mismatch_discards_upload(client, image_bytes):
+    upload_id = create(client, image_bytes, sha256='0' * 64)
+    response = patch(client, upload_id, image_bytes, 0)
+    assert response.status_code == 422
+    assert response.get_json()['sha256'] == hashlib.sha256(image_bytes).hexdigest()
+    assert client.get(f'/upload/chunked/{upload_id}').status_code == 404
+
+
+def test_finalize_is_idempotent(client, image_bytes):
+    upload_id = create(client, image_bytes)
+    patch(client, upload_id, image_bytes, 0)
+    first = client.post(f'/upload/chunked/{upload_id}/finalize')
+    second = client.post(f'/upload/chunked/{upload_id}/finalize')
+    assert first.status_code == second.status_code == 200
+    assert first.get_json() == second.get_json()
+    assert client.get(f'/upload/chunked/{upload_id}').get_json()['data']['status'] == 'done'
+
+
+def test_failed_processing_is_reported_on_every_finalize(client):
+    data = b'not an image'
+    upload_id = create(client, data)
+    patch(client, upload_id, data, 0)
+    responses = [client.post(f'/upload/chunked/{upload_id}/finalize') for _ in range(2)]
+    assert [response.status_code for response in responses] == [500, 500]
+    assert responses[0].get_json() == responses[1].get_json()
+
+
+def test_finalize_during_last_chunk_starts_one_job(client, image_bytes, monkeypatch):
+    digest = store.digest
+    starts = []
+    start_job = image_service.start_chunked_upload_job
+
+    def slow_digest(upload_id):
+        time.sleep(0.3)
+        return digest(upload_id)
+
+    def counting_start_job(info):
+        starts.append(info['id'])
+        return start_job(info)
+
+    monkeypatch.setattr(store, 'digest', slow_digest)
+    monkeypatch.setattr(image_service, 'start_chunked_upload_job', counting_start_job)
+
+    upload_id = create(client, image_bytes)
+    patch(client, upload_id, image_bytes[:100], 0)
+    last_chunk = threading.Thread(target=lambda: patch(
+        image_service.app.test_client(), upload_id, image_bytes[100:], 100
+    ))
+    last_chunk.start()
+    time.sleep(0.1)
+    response = client.post(f'/upload/chunked/{upload_id}/finalize')
+    last_chunk.join()
+
+    assert response.status_code == 200
+    assert starts == [upload_id]
+    assert store.get(upload_id)['status'] == 'done'
+
+
+def age(upload_id, seconds):
+    past = time.time() - seconds
+    for path in (store.part_path(upload_id), store._info_path(upload_id)):
+        if os.path.exists(path):
+            os.utime(path, (past, past))
+
+
+def test_expire_removes_only_idle_uploads(client, image_bytes):
+    idle = create(client, image_bytes)
+    age(idle, store.ttl + 60)
+
+    completed = create(client, image_bytes)
+    patch(client, completed, image_bytes, 0)
+    client.post(f'/upload/chunked/{completed}/finalize')
+
+    store.expire()
+    assert store.get(idle) is None
+    # The part was moved by processing; the result is kept from completion on
+    assert store.get(completed)['status'] == 'done'
+
+    age(completed, store.ttl + 60)
+    store.expire()
+    assert client.post(f'/upload/chunked/{completed}/finalize').status_code == 404
@@ -0,0 +1,249 @@
+import hashlib
+import io
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as image_service  # noqa: E402
+
+RED = (255, 0, 0)
+GPS = {1: 'N', 2: (10.0, 20.0, 30.0), 3: 'E', 4: (100.0, 1.0, 2.0)}
+XMP = (b'<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF><rdf:Description '
+       b'xmlns:exif="http://ns.adobe.com/exif/1.0/" xmlns:xmp="http://ns.adobe.com/xap/1.0/" '
+       b'exif:GPSLatitude="10,20.5N" xmp:Rating="5"><exif:GPSLongitude>100,1.03E</exif:GPSLongitude>'
+       b'</rdf:Description></rdf:RDF></x:xmpmeta>')
+
+requires_jpegtran = pytest.mark.skipif(image_service.JPEGTRAN is None, reason='jpegtran not installed')
+
+
+def segment(payload):
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def make_jpeg(width=64, height=48, orientation=1, gps=False, progressive=False, xmp_segments=()):
+    """Noise JPEG with a red block at the top-left of the stored pixels"""
+    pixels = (np.random.default_rng(0).random((height, width, 3)) * 255).astype('uint8')
+    img = Image.fromarray(pixels)
+    img.paste(RED, (0, 0, width // 4, height // 4))
+    exif = Image.Exif()
+    exif[0x010F] = 'Canon'
+    exif[0x0112] = orientation
+    if gps:
+        exif.get_ifd(0x8825).update(GPS)
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=90, exif=exif, progressive=progressive)
+    data = buffer.getvalue()
+    return data[:2] + b''.join(segment(payload) for payload in xmp_segments) + data[2:]
+
+
+def scan_data(data):
+    f = io.BytesIO(data)
+    image_service.read_jpeg_header(f)
+    return data[f.tell():]
+
+
+def is_red(pixel):
+    return pixel[0] > 200 and pixel[1] < 60 and pixel[2] < 60
+
+
+@pytest.fixture
+def jpeg_path(tmp_path):
+    def write(data):
+        path = tmp_path / 'image.jpg'
+        path.write_bytes(data)
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def no_jpegtran(monkeypatch):
+    monkeypatch.setattr(image_service, 'JPEGTRAN', None)
+
+
+def test_read_jpeg_header_stops_at_start_of_scan():
+    segments = image_service.read_jpeg_header(io.BytesIO(make_jpeg()))
+    assert segments[-1][0] == 0xDA
+    assert any(marker == 0xE1 and payload.startswith(image_service.EXIF_HEADER)
+               for marker, payload in segments)
+
+
+@pytest.mark.parametrize('progressive, sof', [(False, 0xC0), (True, 0xC2)])
+def test_read_jpeg_header_reports_scan_mode(progressive, sof):
+    markers = [marker for marker, _ in image_service.read_jpeg_header(io.BytesIO(make_jpeg(progressive=progressive)))]
+    assert sof in markers
+
+
+@pytest.mark.parametrize('length', [3, 5, 7, 40])
+def test_read_jpeg_header_rejects_truncated_header(length):
+    with pytest.raises(ValueError, match='JPEG header'):
+        image_service.read_jpeg_header(io.BytesIO(make_jpeg()[:length]))
+
+
+def test_read_jpeg_header_rejects_non_jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'PNG')
+    buffer.seek(0)
+    with pytest.raises(ValueError, match='Not a JPEG file'):
+        image_service.read_jpeg_header(buffer)
+
+
+def test_clean_exif_resets_orientation_and_strips_gps():
+    exif = image_service.load_exif(image_service.read_jpeg_header(io.BytesIO(make_jpeg(orientation=6, gps=True))))
+    cleaned = Image.Exif()
+    cleaned.load(image_service.clean_exif(exif, reset_orientation=True))
+    assert cleaned[0x0112] == 1
+    assert 0x8825 not in cleaned
+    assert cleaned[0x010F] == 'Canon'
+
+
+def test_clean_exif_keeps_gps_when_disabled(monkeypatch):
+    monkeypatch.setitem(image_service.app.config, 'STRIP_GPS', False)
+    exif = image_service.load_exif(image_service.read_jpeg_header(io.BytesIO(make_jpeg(orientation=6, gps=True))))
+    cleaned = Image.Exif()
+    cleaned.load(image_service.clean_exif(exif, reset_orientation=False))
+    assert cleaned[0x0112] == 6
+    assert cleaned.get_ifd(0x8825)[2] == GPS[2]
+
+
+def test_rewrite_jpeg_metadata_strips_exif_gps_without_touching_scan(jpeg_path):
+    data = make_jpeg(gps=True)
+    path = jpeg_path(data)
+    assert image_service.rewrite_jpeg_metadata(path)
+    out = open(path, 'rb').read()
+    assert scan_data(out) == scan_data(data)
+    exif = Image.open(path).getexif()
+    assert 0x8825 not in exif
+    assert exif[0x010F] == 'Canon'
+    assert not image_service.rewrite_jpeg_metadata(path)
+
+
+def test_rewrite_jpeg_metadata_strips_only_gps_from_xmp(jpeg_path):
+    path = jpeg_path(make_jpeg(xmp_segments=[image_service.XMP_HEADER + XMP]))
+    assert image_service.rewrite_jpeg_metadata(path)
+    xmp = [payload for marker, payload in image_service.read_jpeg_header(open(path, 'rb'))
+           if payload.startswith(image_service.XMP_HEADER)]
+    assert len(xmp) == 1
+    assert b'GPS' not in xmp[0]
+    assert b'xmp:Rating="5"' in xmp[0]
+
+
+def test_rewrite_jpeg_metadata_strips_gps_from_extended_xmp(jpeg_path):
+    extended = XMP.replace(b'</rdf:Description>', b'<xmp:Label>' + b'x' * 70000 + b'</xmp:Label></rdf:Description>')
+    guid = hashlib.md5(extended).hexdigest().upper().encode()
+    main = XMP.replace(b'xmp:Rating="5"', b'xmp:Rating="5" xmlns:xmpNote="http://ns.adobe.com/xmp/note/" '
+                       b'xmpNote:HasExtendedXMP="' + guid + b'"')
+    chunk = image_service.XMP_EXTENSION_CHUNK
+    chunks = [image_service.XMP_EXTENSION_HEADER + guid + struct.pack('>II', len(extended), offset) +
+              extended[offset:offset + chunk] for offset in range(0, len(extended), chunk)]
+    path = jpeg_path(make_jpeg(xmp_segments=[image_service.XMP_HEADER + main, *chunks]))
+
+    assert image_service.rewrite_jpeg_metadata(path)
+    segments = image_service.read_jpeg_header(open(path, 'rb'))
+    main = next(payload for _, payload in segments if payload.startswith(image_service.XMP_HEADER))
+    header = image_service.XMP_EXTENSION_HEADER
+    parts = {}
+    for _, payload in segments:
+        if payload.startswith(header):
+            new_guid = payload[len(header):len(header) + 32]
+            total, offset = struct.unpack('>II', payload[len(header) + 32:len(header) + 40])
+            parts[offset] = payload[len(header) + 40:]
+    data = b''.join(parts[offset] for offset in sorted(parts))
+    assert len(data) == total
+    assert b'GPS' not in data and b'<xmp:Label>' in data
+    assert new_guid == hashlib.md5(data).hexdigest().upper().encode()
+    assert b'HasExtendedXMP="' + new_guid + b'"' in main
+    assert b'GPS' not in main
+
+
+def test_normalize_jpeg_leaves_compliant_file_untouched(jpeg_path):
+    data = make_jpeg(progressive=True)
+    path = jpeg_path(data)
+    assert image_service.normalize_jpeg(path) == 'unchanged'
+    assert open(path, 'rb').read() == data
+
+
+def test_normalize_jpeg_strips_gps_losslessly(jpeg_path, no_jpegtran):
+    data = make_jpeg(gps=True, progressive=True)
+    path = jpeg_path(data)
+    assert image_service.normalize_jpeg(path) == 'lossless'
+    assert scan_data(open(path, 'rb').read()) == scan_data(data)
+
+
+@pytest.mark.parametrize('orientation, size, red_corner', [
+    (1, (64, 48), (0, 0)),
+    (6, (48, 64), (47, 0)),
+    (8, (48, 64), (0, 63)),
+])
+def test_normalize_jpeg_reencodes_upright_without_jpegtran(jpeg_path, no_jpegtran, orientation, size, red_corner):
+    path = jpeg_path(make_jpeg(orientation=orientation))
+    mode = image_service.normalize_jpeg(path)
+    assert mode == ('unchanged' if orientation == 1 else 'reencoded')
+    with Image.open(path) as img:
+        assert img.size == size
+        assert img.getexif().get(0x0112, 1) == 1
+        assert is_red(img.convert('RGB').getpixel(red_corner))
+
+
+@pytest.mark.parametrize('streaming, progressive', [(False, True), (True, False)])
+def test_normalize_jpeg_scan_mode_when_reencoding(jpeg_path, no_jpegtran, streaming, progressive):
+    path = jpeg_path(make_jpeg(orientation=6))
+    assert image_service.normalize_jpeg(path, streaming=streaming) == 'reencoded'
+    with Image.open(path) as img:
+        assert bool(img.info.get('progressive')) == progressive
+
+
+@requires_jpegtran
+@pytest.mark.parametrize('orientation', [6, 8])
+def test_normalize_jpeg_rotates_losslessly_with_jpegtran(jpeg_path, orientation):
+    path = jpeg_path(make_jpeg(orientation=orientation))
+    assert image_service.normalize_jpeg(path) == 'lossless'
+    with Image.open(path) as img:
+        assert img.size == (48, 64)
+        assert img.getexif()[0x0112] == 1
+        assert img.info.get('progressive')
+
+
+@requires_jpegtran
+@pytest.mark.parametrize('streaming', [False, True])
+def test_normalize_jpeg_converts_scan_mode_with_jpegtran(jpeg_path, streaming):
+    path = jpeg_path(make_jpeg(progressive=streaming))
+    assert image_service.normalize_jpeg(path, streaming=streaming) == 'lossless'
+    with Image.open(path) as img:
+        assert bool(img.info.get('progressive')) == (not streaming)
+
+
+def test_extract_exif_data_past_decompression_bomb_limit(jpeg_path, monkeypatch):
+    path = jpeg_path(make_jpeg(orientation=6, gps=True))
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(path)
+    metadata = image_service.extract_exif_data(path)
+    assert metadata['dimensions'] == '64x48'
+    assert metadata['format'] == 'JPEG'
+    assert metadata['cameraMake'] == 'Canon'
+    assert metadata['orientation'] == 6
+    assert metadata['gpsLocation'] == '10.341667, 100.017222'
+
+
+@pytest.mark.parametrize('fmt', ['PNG', 'WEBP'])
+def test_non_jpeg_named_jpg_is_converted(fmt):
+    buffer = io.BytesIO()
+    Image.new('RGB', (30, 20), RED).save(buffer, fmt)
+    buffer.seek(0)
+    response = image_service.app.test_client().post(
+        '/upload/single', data={'file': (buffer, 'photo.jpg')}
+    )
+    assert response.status_code == 200
+    original = response.get_json()['data']['original']
+    path = os.path.join(image_service.app.config['UPLOAD_FOLDER'], original[len('/uploads/'):])
+    with Image.open(path) as img:
+        assert img.format == 'JPEG'
+        assert img.size == (30, 20)
@@ -0,0 +1,96 @@
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as image_service  # noqa: E402
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setitem(image_service.app.config, 'ASSET_DB_PATH', str(tmp_path / 'assets.db'))
+    image_service.init_asset_db()
+    # Small merges so a few hundred entries cover both the tail and the sorted arrays
+    monkeypatch.setattr(image_service.PerceptualHashIndex, 'MERGE_SIZE', 64)
+    return image_service.PerceptualHashIndex()
+
+
+def random_hashes(count, seed=0):
+    """Clusters of near-duplicates around random centres, plus unrelated hashes"""
+    rng = random.Random(seed)
+    centres = [rng.getrandbits(64) for _ in range(count // 20)]
+    hashes = {}
+    for i in range(count):
+        if i % 2:
+            value = rng.getrandbits(64)
+        else:
+            value = rng.choice(centres)
+            for bit in rng.sample(range(64), rng.randrange(20)):
+                value ^= 1 << bit
+        hashes[f'{i:05d}.jpg'] = value
+    return hashes
+
+
+def brute_force(hashes, query, threshold, limit):
+    matches = [(filename, (value ^ query).bit_count()) for filename, value in hashes.items()]
+    matches = [match for match in matches if match[1] <= threshold]
+    matches.sort(key=lambda match: (match[1], match[0]))
+    return matches[:limit]
+
+
+def queries(hashes, seed=1):
+    rng = random.Random(seed)
+    values = list(hashes.values())
+    near = [rng.choice(values) ^ (1 << rng.randrange(64)) for _ in range(10)]
+    return near + [rng.getrandbits(64) for _ in range(5)] + [0, 2 ** 64 - 1]
+
+
+def assert_matches_brute_force(index, hashes):
+    for query in queries(hashes):
+        for threshold in range(17):
+            expected = brute_force(hashes, query, threshold, 50)
+            assert index.search(f'{query:016x}', threshold, 50) == expected, (query, threshold)
+
+
+def test_search_matches_brute_force_before_merge(index):
+    hashes = random_hashes(60)
+    for filename, value in hashes.items():
+        index.add(filename, f'{value:016x}')
+    assert_matches_brute_force(index, hashes)
+    assert len(index._tail_ids) == 60 and not len(index._ids)
+
+
+def test_search_matches_brute_force_after_merge(index):
+    hashes = random_hashes(500)
+    for filename, value in hashes.items():
+        index.add(filename, f'{value:016x}')
+    assert_matches_brute_force(index, hashes)
+    assert len(index._ids) >= 448 and len(index._tail_ids) < 64
+
+
+def test_readded_filename_replaces_old_hash(index):
+    hashes = random_hashes(300)
+    for filename, value in hashes.items():
+        index.add(filename, f'{value:016x}')
+    index.search('0', 0)  # Load and merge the original hashes
+
+    rng = random.Random(2)
+    for filename in rng.sample(sorted(hashes), 40):
+        hashes[filename] = rng.getrandbits(64)
+        index.add(filename, f'{hashes[filename]:016x}')
+    assert_matches_brute_force(index, hashes)
+    assert len(index) == len(hashes)
+    filename = next(iter(hashes))
+    assert index.get(filename) == f'{hashes[filename]:016x}'
+
+
+def test_threshold_is_capped(index):
+    index.add('a.jpg', '0' * 16)
+    index.add('b.jpg', f'{(1 << 17) - 1:016x}')
+    assert index.search('0', 64) == [('a.jpg', 0)]
+    assert index.search('0', -1) == [('a.jpg', 0)]
@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as image_service  # noqa: E402
+
+INTERACTIVE = image_service.PRIORITY_INTERACTIVE
+BULK = image_service.PRIORITY_BULK
+BACKGROUND = image_service.PRIORITY_BACKGROUND
+
+
+def make_scheduler(workers, reserved=0, user_concurrency=100):
+    return image_service.WorkScheduler(workers, image_service.PRIORITY_WEIGHTS, user_concurrency, reserved=reserved)
+
+
+def block(scheduler, priority=BULK):
+    """Occupy one worker until the returned event is set"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit(priority, None, job)
+    assert started.wait(5)
+    return release, future
+
+
+def test_busy_classes_share_workers_by_weight():
+    # One shared worker, so the dispatch order is exactly the stride order
+    scheduler = make_scheduler(2, reserved=1)
+    release, blocker = block(scheduler)
+    order = []
+    futures = [scheduler.submit(priority, None, order.append, priority)
+               for _ in range(12) for priority in (BULK, BACKGROUND)]
+    release.set()
+    for future in [blocker, *futures]:
+        future.result(5)
+
+    first = order[:12]
+    assert first.count(BULK) == 8
+    assert first.count(BACKGROUND) == 4
+    assert sorted(order) == sorted([BULK] * 12 + [BACKGROUND] * 12)
+
+
+def interactive_wait(scheduler, bulk_jobs):
+    for _ in range(bulk_jobs):
+        scheduler.submit(BULK, None, time.sleep, 0.3)
+    time.sleep(0.05)
+    submitted = time.monotonic()
+    started = scheduler.submit(INTERACTIVE, 'alice', time.monotonic).result(5)
+    return started - submitted
+
+
+def test_reserved_worker_keeps_interactive_latency_low():
+    assert interactive_wait(make_scheduler(3, reserved=1), bulk_jobs=4) < 0.1
+    assert interactive_wait(make_scheduler(2), bulk_jobs=4) > 0.2
+
+
+def test_user_concurrency_caps_jobs_per_user():
+    scheduler = make_scheduler(4, user_concurrency=1)
+    lock = threading.Lock()
+    running = {'alice': 0, None: 0}
+    peak = {'alice': 0, None: 0}
+
+    def job(user_id):
+        with lock:
+            running[user_id] += 1
+            peak[user_id] = max(peak[user_id], running[user_id])
+        time.sleep(0.05)
+        with lock:
+            running[user_id] -= 1
+
+    futures = [scheduler.submit(BULK, user_id, job, user_id) for user_id in ('alice', None) for _ in range(3)]
+    for future in futures:
+        future.result(5)
+    assert peak == {'alice': 1, None: 3}
+
+
+def test_cancelled_jobs_are_not_counted_as_completed():
+    scheduler = make_scheduler(2, reserved=1)
+    release, blocker = block(scheduler)
+    cancelled = scheduler.submit(BULK, None, time.sleep, 0)
+    assert cancelled.cancel()
+    last = scheduler.submit(BULK, None, time.sleep, 0)
+    release.set()
+    blocker.result(5)
+    last.result(5)
+
+    stats = scheduler.stats()[BULK]
+    assert (stats['completed'], stats['failed'], stats['cancelled']) == (2, 0, 1)
+    assert len(scheduler._wait_times[BULK]) == 2
+
+
+def test_pool_keeps_a_shared_worker_beside_reserved_ones(caplog):
+    with caplog.at_level('WARNING'):
+        scheduler = make_scheduler(1, reserved=1)
+    assert (scheduler.workers, scheduler.shared_workers) == (2, 1)
+    assert 'reserved for interactive jobs' in caplog.text
+    assert scheduler.submit(BULK, None, lambda: 'done').result(5) == 'done'